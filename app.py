@@ -10,10 +10,28 @@ import logging
 import threading
 import traceback
 import sys
+import sqlite3
+import atexit
+import copy
+import queue
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from itertools import islice
+from operator import itemgetter
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime, timezone, timedelta
-from typing import Dict, Tuple, Optional, Any, List, Set
-from urllib.parse import urlparse, urlunparse, parse_qs, urlencode, urljoin, unquote
+from typing import Dict, Tuple, Optional, Any, List, Set, Iterable, Iterator
+from urllib.parse import ParseResult, urlparse, urlunparse, parse_qs, parse_qsl, urlencode, urljoin, unquote, unquote_plus
+try:  # pragma: no cover - optional dependency path
+    import orjson  # type: ignore
+    _json_loads = orjson.loads
+except Exception:  # pragma: no cover - fallback when orjson missing
+    orjson = None  # type: ignore
+    _json_loads = json.loads
+
 from flask import (
     Flask,
     jsonify,
@@ -27,6 +45,25 @@ liff_api_bp = Blueprint("liff_api", __name__, url_prefix="/api/liff")
 main_bp = Blueprint("main", __name__)
 
 
+def _json_dumps(obj: Any) -> str:
+    """精簡、不轉義非 ASCII 的 JSON 字串；orjson 可用時走 orjson（非字串 key 等它不收的再退回 json）。"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def _json_response(obj: Any, status: int = 200):
+    """probe 結果這類較大的回應改走 _json_dumps（orjson）；序列化不了的才交給 jsonify。"""
+    try:
+        body = _json_dumps(obj)
+    except TypeError:
+        return jsonify(obj), status
+    return current_app.response_class(body, status=status, mimetype="application/json")
+
+
 @main_bp.get("/diag/browser")
 def diag_browser():
     try:
@@ -67,19 +104,41 @@ handler: Optional["WebhookHandler"] = None  # type: ignore[name-defined]
 DEFAULT_PERIOD_SEC: int = 60
 ALWAYS_NOTIFY: bool = False
 FOLLOW_AREAS_PER_CHECK: int = 0
-PROMO_IMAGE_MAP: Dict[str, str] = {}
-PROMO_DETAILS_MAP: Dict[str, str] = {}
+_PROMO_IMAGE_MAP: Optional[Dict[str, str]] = None
+_PROMO_DETAILS_MAP: Optional[Dict[str, str]] = None
 fs_client: Optional["firestore.Client"] = None  # type: ignore[name-defined]
 FS_OK: bool = False
 FS_ERROR_MSG: str = ""
 MAX_PER_TICK: int = 6
 TICK_SOFT_DEADLINE_SEC: int = 50
+TICK_WORKERS: int = 4
 COL = "watchers"
 
+def _load_promo_map(env_name: str) -> Dict[str, str]:
+    try:
+        data = _json_loads(os.getenv(env_name, "{}") or "{}")
+    except Exception:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+def promo_image_map() -> Dict[str, str]:
+    """PROMO_IMAGE_MAP（perf_id -> 海報網址），第一次用到才解析環境變數。"""
+    global _PROMO_IMAGE_MAP
+    if _PROMO_IMAGE_MAP is None:
+        _PROMO_IMAGE_MAP = _load_promo_map("PROMO_IMAGE_MAP")
+    return _PROMO_IMAGE_MAP
+
+def promo_details_map() -> Dict[str, str]:
+    """PROMO_DETAILS_MAP（perf_id -> Details 頁網址），第一次用到才解析環境變數。"""
+    global _PROMO_DETAILS_MAP
+    if _PROMO_DETAILS_MAP is None:
+        _PROMO_DETAILS_MAP = _load_promo_map("PROMO_DETAILS_MAP")
+    return _PROMO_DETAILS_MAP
+
 def _initialize_globals(app: Flask) -> None:
     global ALLOWED_ORIGINS, line_bot_api, handler, DEFAULT_PERIOD_SEC, ALWAYS_NOTIFY
-    global FOLLOW_AREAS_PER_CHECK, PROMO_IMAGE_MAP, PROMO_DETAILS_MAP
-    global fs_client, FS_OK, FS_ERROR_MSG, MAX_PER_TICK, TICK_SOFT_DEADLINE_SEC
+    global FOLLOW_AREAS_PER_CHECK
+    global fs_client, FS_OK, FS_ERROR_MSG, MAX_PER_TICK, TICK_SOFT_DEADLINE_SEC, TICK_WORKERS
 
     allowed_env = os.getenv("ALLOWED_ORIGINS", "https://liff.line.me")
     ALLOWED_ORIGINS = [o.strip() for o in allowed_env.split(",") if o.strip()]
@@ -102,16 +161,7 @@ def _initialize_globals(app: Flask) -> None:
     FOLLOW_AREAS_PER_CHECK = int(os.getenv("FOLLOW_AREAS_PER_CHECK", "0"))
     MAX_PER_TICK = int(os.getenv("MAX_PER_TICK", "6"))
     TICK_SOFT_DEADLINE_SEC = int(os.getenv("TICK_SOFT_DEADLINE_SEC", "50"))
-
-    try:
-        PROMO_IMAGE_MAP = json.loads(os.getenv("PROMO_IMAGE_MAP", "{}"))
-    except Exception:
-        PROMO_IMAGE_MAP = {}
-
-    try:
-        PROMO_DETAILS_MAP = json.loads(os.getenv("PROMO_DETAILS_MAP", "{}"))
-    except Exception:
-        PROMO_DETAILS_MAP = {}
+    TICK_WORKERS = max(1, int(os.getenv("TICK_WORKERS", "4")))
 
     token = os.getenv("LINE_CHANNEL_ACCESS_TOKEN", "")
     secret = os.getenv("LINE_CHANNEL_SECRET", "")
@@ -198,6 +248,7 @@ try:
     from selenium import webdriver
     from selenium.webdriver.chrome.options import Options
     from selenium.webdriver.chrome.service import Service as ChromeService
+    from selenium.webdriver.support.ui import WebDriverWait
     _SELENIUM_AVAILABLE = True
 except Exception:
     _SELENIUM_AVAILABLE = False
@@ -248,6 +299,27 @@ def _sleep_backoff(attempt: int):
 def _as_list(x):
     return x if isinstance(x, list) else []
 
+def _resp_json(resp: requests.Response) -> Any:
+    """直接從 bytes 解析 JSON（orjson 可用時走 orjson），失敗再退回 resp.json()。"""
+    try:
+        return _json_loads(resp.content)
+    except Exception:
+        return resp.json()
+
+def _json_text_blob(resp: requests.Response, data: Any) -> str:
+    """給子字串/正則搜尋用的 JSON 文字。
+
+    body 沒有任何反斜線跳脫（\\uXXXX、\\/ …）時，原始 UTF-8 內容與重新序列化的結果只差在空白，
+    直接用原文省一次整包序列化；否則照舊 dumps，確保 & 等字元是解碼後的樣子。
+    """
+    raw = resp.content or b""
+    if b"\\" not in raw:
+        try:
+            return raw.decode("utf-8")
+        except UnicodeDecodeError:
+            pass
+    return _json_dumps(data)
+
 IBON_API = "https://ticket.ibon.com.tw/api/ActivityInfo/GetIndexData"
 IBON_TOKEN_API = "https://ticket.ibon.com.tw/api/ActivityInfo/GetToken"
 IBON_BASE = "https://ticket.ibon.com.tw/"
@@ -255,10 +327,65 @@ IBON_HOST = "https://ticket.ibon.com.tw"
 # NEW: 首頁輪播 URL 抽成環境變數（可覆寫）
 IBON_ENT_URL = os.getenv("IBON_ENT_URL", "https://ticket.ibon.com.tw/Index/entertainment")
 UTK_BACKOFF = (0.7, 1.5, 3.0)
+_RE_DETAILS_PATH = re.compile(r"/ActivityInfo/Details/(\d+)")
+_RE_DETAILS_LINK = re.compile(r"(?i)(?:https?://ticket\.ibon\.com\.tw)?/ActivityInfo/Details/(\d+)")
+# URL 正規化函式皆為純函式，同一行程內以 LRU 記憶化
+_URL_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=1024)
+def _cached_urlparse(u: str) -> ParseResult:
+    """urlparse 的記憶化版本（ParseResult 為不可變 tuple，可共用）；給 probe / 回應解碼這類熱路徑。"""
+    return urlparse(u)
+
 
 # 簡單快取（5 分鐘）
 _cache = {"ts": 0, "data": []}
 _CACHE_TTL = 300  # 秒
+# 第二層：SQLite 檔案快取，跨 gunicorn worker / 重啟共用（設成空字串即停用）
+_DISK_CACHE_PATH = os.getenv("IBON_CACHE_PATH", "/tmp/ticketsearch_cache.sqlite3")
+
+
+def _disk_cache_conn() -> sqlite3.Connection:
+    conn = sqlite3.connect(_DISK_CACHE_PATH, timeout=2)
+    conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, ts REAL NOT NULL, value TEXT NOT NULL)")
+    return conn
+
+
+def _disk_cache_get(key: str, ttl: float) -> Optional[Tuple[float, Any]]:
+    """讀取 TTL 內的 (寫入時間, 值)；任何錯誤都視為 miss。"""
+    if not _DISK_CACHE_PATH:
+        return None
+    try:
+        conn = _disk_cache_conn()
+        try:
+            row = conn.execute("SELECT ts, value FROM kv WHERE key = ?", (key,)).fetchone()
+        finally:
+            conn.close()
+        if not row or time.time() - row[0] >= ttl:
+            return None
+        return row[0], _json_loads(row[1])
+    except Exception as e:
+        _get_logger().info(f"[disk-cache] get {key} failed: {e}")
+        return None
+
+
+def _disk_cache_set(key: str, value: Any, ts: Optional[float] = None) -> None:
+    if not _DISK_CACHE_PATH:
+        return
+    try:
+        blob = _json_dumps(value)
+        conn = _disk_cache_conn()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO kv (key, ts, value) VALUES (?, ?, ?)",
+                    (key, ts if ts is not None else time.time(), blob),
+                )
+        finally:
+            conn.close()
+    except Exception as e:
+        _get_logger().info(f"[disk-cache] set {key} failed: {e}")
 
 _CONCERT_WORDS = (
     "演唱會",
@@ -276,37 +403,82 @@ _CONCERT_WORDS = (
     "Live",
 )
 
+_CONCERT_RE = re.compile("|".join(map(re.escape, _CONCERT_WORDS)), re.IGNORECASE)
+
 def _looks_like_concert(title: str) -> bool:
-    t = title or ""
-    low = t.lower()
-    return any(w.lower() in low for w in _CONCERT_WORDS)
+    return bool(_CONCERT_RE.search(title or ""))
+
+
+class _KeepDigitsTable(dict):
+    """str.translate 用的表：數字保留、其餘刪除（同 str.isdigit 語意），查過的字元即快取。"""
+
+    def __missing__(self, code: int) -> Optional[int]:
+        val = code if chr(code).isdigit() else None
+        self[code] = val
+        return val
 
 
+_KEEP_DIGITS = _KeepDigitsTable()
+
+
+def _scan_query(query: str, keys: Tuple[str, ...]) -> Dict[str, str]:
+    """只挑出指定欄位的第一個非空值；語意等同 parse_qs(query)[key][0]，但不建整張表。"""
+    found: Dict[str, str] = {}
+    if not query:
+        return found
+    for part in query.split("&"):
+        name, sep, value = part.partition("=")
+        if not sep or not value:  # parse_qs 預設略過空值
+            continue
+        if "%" in name or "+" in name:
+            name = unquote_plus(name)
+        if name in keys and name not in found:
+            found[name] = unquote_plus(value) if ("%" in value or "+" in value) else value
+            if len(found) == len(keys):
+                break
+    return found
+
+
+@lru_cache(maxsize=_URL_CACHE_SIZE)
+def _url_query_fields(url: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """(PERFORMANCE_ID, PRODUCT_ID, pattern)：各取第一個非空值，沒有就是 None；同一網址只解析一次。"""
+    found = _scan_query(urlparse(url).query, ("PERFORMANCE_ID", "PRODUCT_ID", "pattern"))
+    return found.get("PERFORMANCE_ID"), found.get("PRODUCT_ID"), found.get("pattern")
+
+
+@lru_cache(maxsize=_URL_CACHE_SIZE)
 def build_ibon_details_url(activity_id: str, pattern: str = "ENTERTAINMENT") -> str:
-    aid = "".join(ch for ch in str(activity_id) if ch.isdigit())
+    aid = str(activity_id).translate(_KEEP_DIGITS)
     pat = (pattern or "ENTERTAINMENT").strip() or "ENTERTAINMENT"
     return f"{IBON_HOST}/ActivityInfo/Details?{urlencode({'id': aid, 'pattern': pat})}"
 
 
+@lru_cache(maxsize=_URL_CACHE_SIZE)
 def sanitize_details_url(url: str) -> str:
     try:
         parsed = urlparse(url)
     except Exception:
         return build_ibon_details_url(str(url))
 
-    qs = parse_qs(parsed.query)
-    aid = "".join(ch for ch in (qs.get("id", [""])[0] or "") if ch.isdigit())
+    qs = _scan_query(parsed.query, ("id", "pattern"))
+    aid = qs.get("id", "").translate(_KEEP_DIGITS)
     if not aid:
-        m = re.search(r"/ActivityInfo/Details/(\d+)", parsed.path or "")
+        m = _RE_DETAILS_PATH.search(parsed.path or "")
         if m:
             aid = m.group(1)
-    pattern = (qs.get("pattern", ["ENTERTAINMENT"])[0] or "ENTERTAINMENT").strip() or "ENTERTAINMENT"
+    pattern = qs.get("pattern", "ENTERTAINMENT").strip() or "ENTERTAINMENT"
     if not aid:
         return build_ibon_details_url("", pattern)
     return build_ibon_details_url(aid, pattern)
 
 
 def _decode_ibon_html(response: requests.Response) -> str:
+    # ibon 頁面皆為 UTF-8：除非標頭明確宣告 charset，直接以 UTF-8 解碼，免去 chardet 偵測與二次解碼
+    if "ibon.com.tw" in (_cached_urlparse(response.url or "").netloc or ""):
+        if "charset=" not in (response.headers.get("Content-Type") or "").lower():
+            response.encoding = "utf-8"
+        return response.text
+
     response.encoding = response.encoding or getattr(response, "apparent_encoding", None) or "utf-8"
     html = response.text
     if "�" not in html and html.strip():
@@ -339,29 +511,35 @@ def read_html_safely(response: requests.Response) -> str:
     return html
 
 
+_B64_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=_-"
+
+
 def _extract_xsrf_token(payload: Any) -> Optional[str]:
     """從 ibon 的 GetToken 結構中提取 XSRF token。"""
 
     def _collect_tokens(src: Any) -> List[str]:
+        # 以顯式 stack 做前序走訪（避免遞迴成本與深度上限），順序與原遞迴版相同
         out: List[str] = []
-        if isinstance(src, dict):
-            for key in ("token", "Token", "xsrfToken", "XSRFToken", "XsrfToken", "Xsrf", "XSRF", "Message", "message"):
-                val = src.get(key)
-                if isinstance(val, str) and val.strip():
-                    out.append(val.strip())
-            item = src.get("Item") or src.get("item")
-            if isinstance(item, dict):
-                out.extend(_collect_tokens(item))
-            for v in src.values():
-                if isinstance(v, dict):
-                    out.extend(_collect_tokens(v))
-                elif isinstance(v, list):
-                    out.extend(_collect_tokens(v))
-        elif isinstance(src, list):
-            for v in src:
-                out.extend(_collect_tokens(v))
-        elif isinstance(src, str) and src.strip():
-            out.append(src.strip())
+        stack: List[Any] = [src]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                for key in ("token", "Token", "xsrfToken", "XSRFToken", "XsrfToken", "Xsrf", "XSRF", "Message", "message"):
+                    val = node.get(key)
+                    if isinstance(val, str) and val.strip():
+                        out.append(val.strip())
+                children: List[Any] = []
+                item = node.get("Item") or node.get("item")
+                if isinstance(item, dict):
+                    children.append(item)
+                else:
+                    item = None
+                children.extend(v for v in node.values() if isinstance(v, (dict, list)) and v is not item)
+                stack.extend(reversed(children))
+            elif isinstance(node, list):
+                stack.extend(reversed(node))
+            elif isinstance(node, str) and node.strip():
+                out.append(node.strip())
         return out
 
     def _maybe_decode(candidate: str) -> Optional[str]:
@@ -372,9 +550,8 @@ def _extract_xsrf_token(payload: Any) -> Optional[str]:
             parts = [p.strip() for p in cand.split("|") if p.strip()]
             if parts:
                 return parts[-1]
-        # Base64 (新版 API Message)
-        b64_charset = set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=_-")
-        if all((ch in b64_charset) for ch in cand):
+        # Base64 (新版 API Message)；strip 掉字元集後為空 => 全為 base64 字元
+        if not cand.strip(_B64_ALPHABET):
             padded = cand + "=" * ((4 - len(cand) % 4) % 4)
             try:
                 decoded = base64.b64decode(padded).decode("utf-8", errors="ignore")
@@ -396,17 +573,73 @@ def _extract_xsrf_token(payload: Any) -> Optional[str]:
     return None
 
 
-def _prepare_ibon_session() -> Tuple[requests.Session, Optional[str]]:
-    """建立與 ibon API 溝通所需的 session 與 XSRF token。"""
+# ==== 共用連線池（keep-alive，避免每次重新 TCP+TLS 握手）====
+_SHARED_SESSION: Optional[requests.Session] = None
+_SHARED_SESSION_LOCK = threading.Lock()
+_IBON_TOKEN_LOCK = threading.Lock()
+# pool_connections = 保留幾個 host 的連線池（ticket/orders.ibon、api、兩個 azureedge 圖片 host…），
+# 太小會在 host 間輪替時把池子踢掉重建；pool_maxsize 需涵蓋 livemap/utk/details 執行緒池的並行數
+_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "8"))
+_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "32"))
+# 只重試「連不上」（含連線池裡已被對方關掉的閒置連線）；讀取逾時與 5xx 交給各呼叫端自己的退避/斷路器
+_POOL_RETRY = Retry(total=2, connect=2, read=0, status=0, redirect=None, backoff_factor=0.3)
+
+
+def _shared_session() -> requests.Session:
+    """回傳行程內共用的 requests.Session（含 HTTPAdapter 連線池）。"""
+
+    global _SHARED_SESSION
+    if _SHARED_SESSION is not None:
+        return _SHARED_SESSION
+    with _SHARED_SESSION_LOCK:
+        if _SHARED_SESSION is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=_POOL_CONNECTIONS,
+                pool_maxsize=_POOL_MAXSIZE,
+                max_retries=_POOL_RETRY,
+            )
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            s.headers.update({
+                "User-Agent": UA,
+                "Accept-Language": "zh-TW,zh;q=0.9,en;q=0.6",
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            })
+            _SHARED_SESSION = s
+    return _SHARED_SESSION
 
-    s = requests.Session()
-    s.headers.update({
-        "User-Agent": UA,
-        "Accept-Language": "zh-TW,zh;q=0.9,en;q=0.6",
-        "Accept": "application/json, text/plain, */*",
-        "Connection": "close",
-    })
 
+# XSRF token 快取（預設 10 分鐘），避免每次都重新 warm-up + GetToken
+_token_cache: Dict[str, Any] = {"ts": 0.0, "token": None}
+_TOKEN_TTL = int(os.getenv("IBON_TOKEN_TTL_SEC", "600"))
+
+
+def _prepare_ibon_session(refresh: bool = False) -> Tuple[requests.Session, Optional[str]]:
+    """取得與 ibon API 溝通所需的 session 與 XSRF token（session 為共用連線池）。
+
+    token 在 TTL 內直接沿用；refresh=True（遇到 401/403/419）時才強制重新取得。
+    """
+
+    s = _shared_session()
+    requested_at = time.time()
+    if not refresh and _token_cache["token"] and requested_at - _token_cache["ts"] < _TOKEN_TTL:
+        return s, _token_cache["token"]
+
+    with _IBON_TOKEN_LOCK:
+        # 等鎖期間若已有其他執行緒刷新過，直接沿用
+        cached = _token_cache["token"]
+        if cached and _token_cache["ts"] >= requested_at:
+            return s, cached
+        if not refresh and cached and time.time() - _token_cache["ts"] < _TOKEN_TTL:
+            return s, cached
+        token = _refresh_ibon_token(s)
+        _token_cache["token"] = token
+        _token_cache["ts"] = time.time()
+        return s, token
+
+
+def _refresh_ibon_token(s: requests.Session) -> Optional[str]:
     try:
         http_get(s, IBON_ENT_URL, timeout=10)
     except Exception as e:
@@ -420,13 +653,14 @@ def _prepare_ibon_session() -> Tuple[requests.Session, Optional[str]]:
                 "Origin": "https://ticket.ibon.com.tw",
                 "Referer": IBON_ENT_URL,
                 "X-Requested-With": "XMLHttpRequest",
+                "Accept": "application/json, text/plain, */*",
             },
             timeout=10,
         )
         if token_resp.status_code == 200:
             data: Any
             try:
-                data = token_resp.json()
+                data = _resp_json(token_resp)
             except Exception:
                 data = token_resp.text
             token = _extract_xsrf_token(data)
@@ -447,10 +681,23 @@ def _prepare_ibon_session() -> Tuple[requests.Session, Optional[str]]:
         except Exception:
             s.cookies.set("XSRF-TOKEN", token)
 
-    return s, token
+    return token
 
 # -------- HTML 解析 --------
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, FeatureNotFound, SoupStrainer
+import soupsieve  # bs4 的 CSS selector 引擎；預先編譯常用 selector
+
+
+def _pick_soup_parser() -> str:
+    """優先使用 lxml（C 實作，遠快於 html.parser）；未安裝時才退回純 Python 版。"""
+    try:
+        BeautifulSoup("", "lxml")
+        return "lxml"
+    except FeatureNotFound:
+        return "html.parser"
+
+
+_SOUP_PARSER = _pick_soup_parser()
 
 def _normalize_item(row):
     """
@@ -478,24 +725,24 @@ def _normalize_item(row):
               or row.get("Id") or row.get("ID"))
     pattern = row.get("Pattern") or row.get("pattern") or row.get("Category") or "ENTERTAINMENT"
 
-    if not url and act_id:
-        url = urljoin(IBON_BASE, f"/ActivityInfo/Details?id={act_id}")
-
-    # 統一為絕對網址
-    if url and not url.lower().startswith("http"):
-        url = urljoin(IBON_BASE, url)
-
+    # details_url 只決定一次：能直接組出正規網址時就不再 sanitize
     details_url: Optional[str] = None
-    if url and "/ActivityInfo/Details" in url:
-        details_url = sanitize_details_url(url)
-    else:
-        inferred_id = _activity_id_from_url(url) if url else None
-        use_id = str(act_id or inferred_id or "").strip()
-        if use_id:
-            details_url = build_ibon_details_url(use_id, pattern)
-
-    if not details_url and url:
-        details_url = sanitize_details_url(url)
+    if not url and act_id:
+        # 等同 sanitize_details_url(".../ActivityInfo/Details?id=<act_id>")
+        details_url = build_ibon_details_url(str(act_id))
+        url = details_url
+    elif url:
+        # 統一為絕對網址
+        if not url.lower().startswith("http"):
+            url = urljoin(IBON_BASE, url)
+        if "/ActivityInfo/Details" in url:
+            details_url = sanitize_details_url(url)
+        else:
+            use_id = str(act_id or _activity_id_from_url(url) or "").strip()
+            if use_id:
+                details_url = build_ibon_details_url(use_id, pattern)
+            else:
+                details_url = sanitize_details_url(url)
 
     # 有些圖片給相對路徑
     if img and not img.lower().startswith("http"):
@@ -515,15 +762,17 @@ def _normalize_item(row):
     return payload
 
 
+@lru_cache(maxsize=_URL_CACHE_SIZE)
 def _activity_id_from_url(url: str) -> Optional[str]:
     try:
         parsed = urlparse(url)
-        q = parse_qs(parsed.query)
-        for key in ("id", "ID", "activityId", "ActivityId"):
-            vals = q.get(key)
-            if vals:
-                return str(vals[0])
-        m = re.search(r"/ActivityInfo/Details/(\d+)", parsed.path or "")
+        keys = ("id", "ID", "activityId", "ActivityId")
+        q = _scan_query(parsed.query, keys)
+        for key in keys:
+            val = q.get(key)
+            if val:
+                return val
+        m = _RE_DETAILS_PATH.search(parsed.path or "")
         if m:
             return m.group(1)
     except Exception:
@@ -538,176 +787,209 @@ def fetch_ibon_list_via_api(limit=10, keyword=None, only_concert=False):
     永遠回傳 list。
     """
     global _cache
+    cap = max(1, int(limit))
+    kw_lower = (keyword or "").strip().lower()
+    concert_search = _CONCERT_RE.search if only_concert else None
+
+    def _keep(it) -> bool:
+        if not (kw_lower or concert_search):
+            return True
+        title = it.get("title", "")
+        if kw_lower and kw_lower not in title.lower():
+            return False
+        return concert_search is None or concert_search(title or "") is not None
+
     now = time.time()
+    if not (now - _cache["ts"] < _CACHE_TTL and _cache["data"]):
+        disk_hit = _disk_cache_get("ibon_list", _CACHE_TTL)
+        if disk_hit and disk_hit[1]:
+            _cache = {"ts": disk_hit[0], "data": disk_hit[1]}
+
     if now - _cache["ts"] < _CACHE_TTL and _cache["data"]:
-        base_rows = _cache["data"]
-    else:
-        if _breaker_open_now():
-            return []  # 斷路器期間直接跳過 API
+        out = list(islice((it for it in _cache["data"] if _keep(it)), cap))
+        # 提早截斷的快取只是完整清單的前綴：湊滿 cap 筆就和完整結果一致，否則重抓
+        if len(out) >= cap or _cache.get("complete", True):
+            return out
 
-        session: Optional[requests.Session] = None
-        token: Optional[str] = None
-        base_rows: List[Dict[str, Optional[str]]] = []
-        seen_urls: set[str] = set()
-
-        patterns = ["ENTERTAINMENT", "CONCERT", "LEISURE"]
-
-        def _extract_lists(data: Any) -> List[Dict[str, Any]]:
-            buckets: List[Dict[str, Any]] = []
-
-            def walk(node: Any):
-                if isinstance(node, list):
-                    for it in node:
-                        if isinstance(it, dict):
-                            buckets.append(it)
-                        walk(it)
-                elif isinstance(node, dict):
-                    for v in node.values():
-                        if isinstance(v, list):
-                            walk(v)
-                        elif isinstance(v, dict):
-                            walk(v)
-
-            if isinstance(data, dict):
-                item = data.get("Item") or data.get("item")
-                if item is not None:
-                    walk(item)
-                else:
-                    walk(data)
-            elif isinstance(data, list):
-                walk(data)
-            return buckets
+    if _breaker_open_now():
+        return []  # 斷路器期間直接跳過 API
 
-        def _append_rows(payload: Any):
-            nonlocal base_rows
+    base_rows: List[Dict[str, Optional[str]]] = []
+    seen_urls: set[str] = set()
 
-            container: Any = payload.get("Item") if isinstance(payload, dict) else payload
-            candidate_lists: List[List[Dict[str, Any]]] = []
+    patterns = ["ENTERTAINMENT", "CONCERT", "LEISURE"]
+
+    def _extract_lists(data: Any) -> List[Dict[str, Any]]:
+        buckets: List[Dict[str, Any]] = []
+
+        root = data
+        if isinstance(data, dict):
+            item = data.get("Item") or data.get("item")
+            if item is not None:
+                root = item
+
+        # 顯式 stack 前序走訪；第二欄標記節點是否為 list 的元素（只有這種 dict 會收進 buckets）
+        stack: List[Tuple[Any, bool]] = [(root, False)]
+        while stack:
+            node, in_list = stack.pop()
+            if isinstance(node, list):
+                stack.extend((it, True) for it in reversed(node) if isinstance(it, (dict, list)))
+            elif isinstance(node, dict):
+                if in_list:
+                    buckets.append(node)
+                stack.extend(
+                    (v, False) for v in reversed(list(node.values())) if isinstance(v, (dict, list))
+                )
+        return buckets
 
-            if isinstance(container, dict):
-                for key in ("List", "HotList", "ActivityList"):
-                    val = container.get(key)
-                    if isinstance(val, list) and val:
-                        candidate_lists.append(val)
+    matched = 0
 
-            if not candidate_lists:
-                candidate_lists.append(_extract_lists(container))
+    def _append_rows(payload: Any) -> bool:
+        """把 payload 的活動併進 base_rows；符合過濾條件的已湊滿 cap 筆時回傳 True。"""
+        nonlocal base_rows, matched
 
-            for arr in candidate_lists:
-                for raw in arr or []:
-                    if not isinstance(raw, dict):
-                        continue
-                    try:
-                        item = _normalize_item(raw)
-                    except Exception:
-                        continue
+        container: Any = payload.get("Item") if isinstance(payload, dict) else payload
+        candidate_lists: List[List[Dict[str, Any]]] = []
 
-                    act_id = (
-                        raw.get("ActivityID")
-                        or raw.get("ActivityId")
-                        or raw.get("ActivityInfoId")
-                        or raw.get("GameId")
-                        or raw.get("GameID")
-                    )
-                    if act_id:
-                        act_id = str(act_id)
-                    url = item.get("url")
-                    if not url and act_id:
-                        url = urljoin(IBON_BASE, f"/ActivityInfo/Details?id={act_id}")
-                        item["url"] = url
-
-                    if not url:
-                        continue
+        if isinstance(container, dict):
+            for key in ("List", "HotList", "ActivityList"):
+                val = container.get(key)
+                if isinstance(val, list) and val:
+                    candidate_lists.append(val)
 
-                    canon = canonicalize_url(url)
-                    if canon in seen_urls:
-                        continue
+        if not candidate_lists:
+            candidate_lists.append(_extract_lists(container))
 
-                    seen_urls.add(canon)
-                    base_rows.append(item)
+        for arr in candidate_lists:
+            for raw in arr or []:
+                if not isinstance(raw, dict):
+                    continue
+                try:
+                    item = _normalize_item(raw)
+                except Exception:
+                    continue
 
-        for pattern in patterns:
-            for attempt in range(3):
-                if session is None:
-                    session, token = _prepare_ibon_session()
+                act_id = (
+                    raw.get("ActivityID")
+                    or raw.get("ActivityId")
+                    or raw.get("ActivityInfoId")
+                    or raw.get("GameId")
+                    or raw.get("GameID")
+                )
+                if act_id:
+                    act_id = str(act_id)
+                url = item.get("url")
+                if not url and act_id:
+                    url = urljoin(IBON_BASE, f"/ActivityInfo/Details?id={act_id}")
+                    item["url"] = url
+
+                if not url:
+                    continue
 
-                if session is None:
-                    break
+                # details_url 已由 build_ibon_details_url 正規化，可直接當去重 key
+                canon = item.get("details_url") or canonicalize_url(url)
+                if canon in seen_urls:
+                    continue
 
-                try:
-                    headers = {
-                        "Origin": "https://ticket.ibon.com.tw",
-                        "Referer": IBON_ENT_URL,
-                        "X-Requested-With": "XMLHttpRequest",
-                    }
-                    if token:
-                        headers["X-XSRF-TOKEN"] = token
-
-                    r = session.post(
-                        IBON_API,
-                        headers=headers,
-                        data={"pattern": pattern or ""},
-                        timeout=10,
-                    )
-                    if r.status_code == 200:
-                        try:
-                            data = r.json()
-                        except Exception:
-                            data = {}
-                        status = data.get("StatusCode") if isinstance(data, dict) else None
-                        if status not in (None, 0):
-                            _get_logger().info(f"[ibon api] status={status} pattern={pattern}")
-                        _append_rows(data)
-                        break
+                seen_urls.add(canon)
+                base_rows.append(item)
+                if _keep(item):
+                    matched += 1
+                    if matched >= cap:
+                        return True
+        return False
 
-                    if r.status_code in (401, 403, 419):
-                        _get_logger().info(f"[ibon api] auth http={r.status_code}, refresh token")
-                        session, token = _prepare_ibon_session()
-                        continue
+    def _fetch_pattern(pattern: str) -> Tuple[Any, bool]:
+        """抓單一 pattern，回傳 (data, 是否遇到 5xx)。"""
+        sess, tok = session, token
+        for attempt in range(3):
+            if sess is None or _breaker_open_now():
+                break
+            try:
+                headers = {
+                    "Origin": "https://ticket.ibon.com.tw",
+                    "Referer": IBON_ENT_URL,
+                    "X-Requested-With": "XMLHttpRequest",
+                    "Accept": "application/json, text/plain, */*",
+                }
+                if tok:
+                    headers["X-XSRF-TOKEN"] = tok
+
+                r = sess.post(
+                    IBON_API,
+                    headers=headers,
+                    data={"pattern": pattern or ""},
+                    timeout=10,
+                )
+                if r.status_code == 200:
+                    try:
+                        data = _resp_json(r)
+                    except Exception:
+                        data = {}
+                    status = data.get("StatusCode") if isinstance(data, dict) else None
+                    if status not in (None, 0):
+                        _get_logger().info(f"[ibon api] status={status} pattern={pattern}")
+                    return data, False
+
+                if r.status_code in (401, 403, 419):
+                    _get_logger().info(f"[ibon api] auth http={r.status_code}, refresh token")
+                    sess, tok = _prepare_ibon_session(refresh=True)
+                    continue
 
-                    if 500 <= r.status_code < 600:
-                        _get_logger().warning(f"[ibon api] http={r.status_code} pattern={pattern} -> open breaker")
-                        _open_breaker()
-                        base_rows = []
-                        break
+                if 500 <= r.status_code < 600:
+                    _get_logger().warning(f"[ibon api] http={r.status_code} pattern={pattern} -> open breaker")
+                    _open_breaker()
+                    return None, True
 
-                    _get_logger().info(f"[ibon api] http={r.status_code} pattern={pattern}")
-                except Exception as e:
-                    _get_logger().info(f"[ibon api] err: {e}")
-                _sleep_backoff(attempt)
+                _get_logger().info(f"[ibon api] http={r.status_code} pattern={pattern}")
+            except Exception as e:
+                _get_logger().info(f"[ibon api] err: {e}")
+            _sleep_backoff(attempt)
+        return None, False
 
-            if _breaker_open_now():
+    session, token = _prepare_ibon_session()
+    results: Dict[str, Any] = {}
+    server_error = False
+    with ThreadPoolExecutor(max_workers=len(patterns)) as pool:
+        futures = {pool.submit(_fetch_pattern, p): p for p in patterns}
+        for fut in as_completed(futures):
+            try:
+                data, failed = fut.result()
+            except Exception as e:
+                _get_logger().info(f"[ibon api] worker err: {e}")
+                continue
+            if failed:
+                server_error = True
+            elif data is not None:
+                results[futures[fut]] = data
+
+    # 依 pattern 順序合併，確保輸出順序穩定；湊滿 cap 筆就不再走剩下的 JSON
+    complete = True
+    if not server_error:
+        for pattern in patterns:
+            if pattern in results and _append_rows(results[pattern]):
+                complete = False
                 break
 
-        _cache = {"ts": now, "data": base_rows}
+    _cache = {"ts": now, "data": base_rows, "complete": complete}
+    if base_rows and complete:
+        _disk_cache_set("ibon_list", base_rows, ts=now)
 
     # 過濾 + 截斷（這個 return 要在迴圈外！）
-    out = []
-    kw = (keyword or "").strip()
-    kw_lower = kw.lower()
-    for it in base_rows or []:
-        title = it.get("title", "")
-        if kw and kw_lower not in title.lower():
-            continue
-        if only_concert and not _looks_like_concert(title):
-            continue
-        out.append(it)
-        if len(out) >= max(1, int(limit)):
-            break
-    return out
+    return list(islice((it for it in base_rows or [] if _keep(it)), cap))
 
 # --------- LINE SDK（可選）---------
 HAS_LINE = True
 try:
     from linebot import LineBotApi, WebhookHandler
-    from linebot.exceptions import InvalidSignatureError
+    from linebot.exceptions import InvalidSignatureError, LineBotApiError
     from linebot.models import (
         MessageEvent, TextMessage, TextSendMessage, ImageSendMessage,
         FollowEvent, JoinEvent,
     )
 except Exception as e:
     HAS_LINE = False
-    LineBotApi = WebhookHandler = InvalidSignatureError = None
+    LineBotApi = WebhookHandler = InvalidSignatureError = LineBotApiError = None
     MessageEvent = TextMessage = TextSendMessage = ImageSendMessage = None
     logging.warning(f"[init] line-bot-sdk not available: {e}")
 
@@ -732,6 +1014,51 @@ except Exception:  # pragma: no cover - fallback when api_core missing
 
         pass
 
+# === Warm Playwright browser（常駐，避免每次呼叫都重啟 Chromium）===
+# Playwright sync API 物件綁定建立它的執行緒，因此由單一專屬執行緒持有並代為執行。
+_PW_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="playwright")
+_PW: Dict[str, Any] = {"pw": None, "browser": None, "ctx": None}
+_PW_CALL_TIMEOUT = 60
+
+
+def _pw_context():
+    if _PW["ctx"] is None:
+        pw = sync_playwright().start()
+        try:
+            browser = pw.chromium.launch(headless=True, args=["--no-sandbox", "--disable-dev-shm-usage"])
+            ctx = browser.new_context(locale="zh-TW")
+        except Exception:
+            pw.stop()
+            raise
+        _PW.update(pw=pw, browser=browser, ctx=ctx)
+    return _PW["ctx"]
+
+
+def _pw_reset() -> None:
+    for key, closer in (("ctx", "close"), ("browser", "close"), ("pw", "stop")):
+        obj = _PW.get(key)
+        if obj is not None:
+            try:
+                getattr(obj, closer)()
+            except Exception:
+                pass
+        _PW[key] = None
+
+
+def _pw_evaluate(url: str, js_func_literal: str):
+    try:
+        page = _pw_context().new_page()
+        try:
+            page.goto(url, wait_until="domcontentloaded")
+            return page.evaluate(js_func_literal)
+        finally:
+            page.close()
+    except Exception:
+        # 瀏覽器掛掉或狀態異常時整組重建，下次呼叫重新啟動
+        _pw_reset()
+        raise
+
+
 # === Browser helper: Selenium → Playwright fallback ===
 def _run_js_with_fallback(url: str, js_func_literal: str):
     """
@@ -754,11 +1081,16 @@ def _run_js_with_fallback(url: str, js_func_literal: str):
             opts.binary_location = chrome_path
 
             driver = webdriver.Chrome(service=ChromeService(executable_path=chromedriver_path), options=opts)
-            driver.set_page_load_timeout(30)
+            driver.set_page_load_timeout(10)
             driver.get(url)
-            # 給一點時間讓前端輪播初始
+            # 等到 XSRF cookie 出現（同步 XHR 需要）或頁面載入完成即可，不再固定睡 1.5 秒
             try:
-                time.sleep(1.5)
+                WebDriverWait(driver, 5, poll_frequency=0.1).until(
+                    lambda d: d.execute_script(
+                        "return /(?:^|;\\s*)XSRF-TOKEN=/.test(document.cookie)"
+                        " || document.readyState === 'complete';"
+                    )
+                )
             except Exception:
                 pass
 
@@ -776,13 +1108,7 @@ def _run_js_with_fallback(url: str, js_func_literal: str):
     # 2) Playwright fallback
     if _PLAYWRIGHT_AVAILABLE:
         try:
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=True, args=["--no-sandbox", "--disable-dev-shm-usage"])
-                ctx = browser.new_context(locale="zh-TW")
-                page = ctx.new_page()
-                page.goto(url, wait_until="networkidle")
-                res = page.evaluate(js_func_literal)
-                browser.close()
+            res = _PW_EXECUTOR.submit(_pw_evaluate, url, js_func_literal).result(timeout=_PW_CALL_TIMEOUT)
             _get_logger().info("[browser] Playwright path OK")
             return res
         except Exception as e:
@@ -790,16 +1116,11 @@ def _run_js_with_fallback(url: str, js_func_literal: str):
 
     # 3) 最後備援：純 requests 抓 HTML 用正則撈 Details（回傳 URL list）
     try:
-        s = requests.Session()
-        s.headers.update({"User-Agent": "Mozilla/5.0"})
+        s = sess_default()
         r = http_get(s, url, timeout=12)
         html = read_html_safely(r)
-        urls = []
-        for m in re.finditer(r'(?i)(?:https?://ticket\.ibon\.com\.tw)?/ActivityInfo/Details/(\d+)', html):
-            u = urljoin("https://ticket.ibon.com.tw/", m.group(0))
-            urls.append(u)
-        seen = set()
-        return [u for u in urls if not (u in seen or seen.add(u))]
+        urls = [f"{IBON_HOST}/ActivityInfo/Details/{gid}" for gid in _RE_DETAILS_LINK.findall(html)]
+        return list(dict.fromkeys(urls))
     except Exception as e:
         _get_logger().error(f"[browser] no engine available and HTML fallback failed: {e}")
         return []
@@ -882,30 +1203,41 @@ def grab_ibon_carousel_urls():
     only_details = sorted({u for u in cleaned if "/ActivityInfo/Details/" in u})
     return only_details
 
+_DETAILS_FETCH_WORKERS = int(os.getenv("DETAILS_FETCH_WORKERS", "6"))
+
 def _items_from_details_urls(urls: List[str], limit=10, keyword=None, only_concert=False):
     items = []
+    if not urls:
+        return items
     s = sess_default()
-    for u in urls:
-        try:
-            info = fetch_from_ticket_details(u, s) or {}
-            details_url = info.get("details_url") or sanitize_details_url(u)
-            title = info.get("title") or "活動"
-            if keyword and keyword not in title:
-                continue
-            if only_concert and not _looks_like_concert(title):
+    max_items = max(1, int(limit))
+    pool = ThreadPoolExecutor(max_workers=max(1, min(_DETAILS_FETCH_WORKERS, len(urls))))
+    try:
+        # 依原始順序收集結果，湊滿 limit 後取消其餘尚未開始的請求
+        futures = [(u, pool.submit(fetch_from_ticket_details, u, s)) for u in urls]
+        for u, fut in futures:
+            try:
+                info = fut.result() or {}
+                details_url = info.get("details_url") or sanitize_details_url(u)
+                title = info.get("title") or "活動"
+                if keyword and keyword not in title:
+                    continue
+                if only_concert and not _looks_like_concert(title):
+                    continue
+                img = info.get("poster") or None
+                items.append({
+                    "title": title,
+                    "url": details_url,
+                    "details_url": details_url,
+                    "image": img,
+                    "image_url": img,
+                })
+                if len(items) >= max_items:
+                    break
+            except Exception:
                 continue
-            img = info.get("poster") or None
-            items.append({
-                "title": title,
-                "url": details_url,
-                "details_url": details_url,
-                "image": img,
-                "image_url": img,
-            })
-            if len(items) >= max(1, int(limit)):
-                break
-        except Exception:
-            continue
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
     return items
 
 @main_bp.get("/ibon/carousel")
@@ -924,6 +1256,32 @@ _RE_DATE = re.compile(
     r"\s*(?P<time>\d{1,2}[：:]\d{2})"
 )
 _RE_AREA_TAG = re.compile(r"<area\b[^>]*>", re.I)
+# UTK0201_000 / live.map / UTK0101 解析用
+_RE_SEATMAP_URL = re.compile(r'https?://[^\s"\'<>]+static_bigmap[^\s"\'<>]+?\.(?:jpg|jpeg|png)', re.I)
+_RE_JSONDATA = re.compile(r"jsonData\s*=\s*'(\[.*?\])'", re.S)
+_RE_AREA_ID_PARAM = re.compile(r'PERFORMANCE_PRICE_AREA_ID=([A-Za-z0-9]+)')
+_RE_AREA_NAME_HINT = re.compile(r"(樓|區|包廂)")
+_RE_STATUS_CELL = re.compile(r"已售完|熱賣|\b\d{1,3}\b")
+_RE_SELLING = re.compile("熱賣|可售")
+_RE_ONSALE = re.compile("熱賣|可售|可購")
+_RE_SEND_CODE = re.compile(
+    r"javascript:Send\([^)]*'(?:B0[0-9A-Z]{6,10})'\s*,\s*'(B0[0-9A-Z]{6,10})'", re.I
+)
+_RE_DATA_AREA = re.compile(r'(?:data-(?:area|area-id|price-area-id))=["\'](B0[0-9A-Z]{6,10})["\']', re.I)
+_RE_DATA_QTY = re.compile(r'\bdata-(?:left|remain|qty|count)=["\']?(\d{1,3})["\']?', re.I)
+_RE_TITLE_ATTR = re.compile(r'title="([^"]*)"', re.I)
+_RE_ALT_LABEL = re.compile(r'(?:alt|aria-label)=["\']([^"\']*)["\']', re.I)
+_RE_LIVEMAP_REMAIN = re.compile(r'(?:剩餘|尚餘|可售|可購)[^\d]{0,6}(\d{1,3})')
+_RE_AREA_LEFT_REMAIN = re.compile(r'(?:剩餘|尚餘|可購買|可售)[^\d]{0,6}(\d{1,3})')
+_RE_ZHANG = re.compile(r'(\d{1,3})\s*張')
+_RE_DIGITS = re.compile(r"\d+")
+_RE_YMD = re.compile(r"\d{4}/\d{1,2}/\d{1,2}")
+_RE_HM = re.compile(r"\d{1,2}[：:]\d{2}")
+_RE_HM_WORD = re.compile(r"\b\d{1,2}[：:]\d{2}\b")
+_RE_DATE_ONLY = re.compile(r"\d{4}(?:/|\.)\d{1,2}(?:/|\.)\d{1,2}|\d{4}年\d{1,2}月\d{1,2}日?")
+_RE_WS = re.compile(r"\s+")
+_RE_HAS_DIGIT = re.compile(r"\d")
+_RE_TILDE_TAIL = re.compile(r"[~～].*")
 _SALE_KEYWORDS = ("售票", "販售", "銷售", "開賣", "購票")
 _EVENT_DATE_KEYWORDS = (
     "演出",
@@ -935,11 +1293,13 @@ _EVENT_DATE_KEYWORDS = (
     "開演",
     "場次",
 )
+# 比對對象是 .lower() 過的行，關鍵字也先轉小寫再組成一條 alternation
+_RE_EVENT_DATE_KEYWORD = re.compile("|".join(re.escape(k.lower()) for k in _EVENT_DATE_KEYWORDS))
 
 def _normalize_date_text(text: Optional[str]) -> Optional[str]:
     if not text:
         return None
-    digits = re.findall(r"\d+", text)
+    digits = _RE_DIGITS.findall(text)
     if len(digits) >= 3:
         y, m, d = digits[:3]
         try:
@@ -953,7 +1313,7 @@ def _normalize_date_text(text: Optional[str]) -> Optional[str]:
 def _normalize_time_text(text: Optional[str]) -> Optional[str]:
     if not text:
         return None
-    digits = re.findall(r"\d+", text)
+    digits = _RE_DIGITS.findall(text)
     if len(digits) >= 2:
         h, minute = digits[:2]
         try:
@@ -984,8 +1344,23 @@ def _format_datetime_match(m: Optional[re.Match]) -> Optional[str]:
 def _is_sale_context(text: str) -> bool:
     if not text:
         return False
-    low = str(text).lower()
-    return any(kw in low for kw in _SALE_KEYWORDS)
+    # 關鍵字全是中文，大小寫轉換不影響結果，直接比對原字串
+    text = str(text)
+    return any(kw in text for kw in _SALE_KEYWORDS)
+
+
+def _ymd_hm_to_datetime(date_text: str, time_text: Optional[str] = None) -> datetime:
+    """等同 strptime("%Y/%m/%d %H:%M")；固定寬度的標準格式直接切片，其餘交給 strptime。"""
+    d = date_text
+    if len(d) == 10 and d.isascii() and d[4] == "/" and d[7] == "/" and d[:4].isdigit() and d[5:7].isdigit() and d[8:].isdigit():
+        if time_text is None:
+            return datetime(int(d[:4]), int(d[5:7]), int(d[8:]))
+        t = time_text
+        if len(t) == 5 and t.isascii() and t[2] == ":" and t[:2].isdigit() and t[3:].isdigit():
+            return datetime(int(d[:4]), int(d[5:7]), int(d[8:]), int(t[:2]), int(t[3:]))
+    if time_text is None:
+        return datetime.strptime(date_text, "%Y/%m/%d")
+    return datetime.strptime(f"{date_text} {time_text}", "%Y/%m/%d %H:%M")
 
 
 def _parse_datetime_string(dt_text: str) -> Tuple[Optional[datetime], bool]:
@@ -994,31 +1369,69 @@ def _parse_datetime_string(dt_text: str) -> Tuple[Optional[datetime], bool]:
         return None, False
     cleaned = candidate.replace("年", "/").replace("月", "/").replace("日", "")
     cleaned = cleaned.replace(".", "/")
-    date_match = re.search(r"\d{4}/\d{1,2}/\d{1,2}", cleaned)
-    time_match = re.search(r"\d{1,2}[：:]\d{2}", cleaned)
+    date_match = _RE_YMD.search(cleaned)
+    time_match = _RE_HM.search(cleaned)
     date_text = _normalize_date_text(date_match.group(0) if date_match else cleaned)
     time_text = _normalize_time_text(time_match.group(0) if time_match else None)
     if date_text and time_text:
         try:
-            return datetime.strptime(f"{date_text} {time_text}", "%Y/%m/%d %H:%M"), True
+            return _ymd_hm_to_datetime(date_text, time_text), True
         except Exception:
             pass
     if date_text:
         try:
-            return datetime.strptime(date_text, "%Y/%m/%d"), bool(time_text)
+            return _ymd_hm_to_datetime(date_text), bool(time_text)
         except Exception:
             return None, bool(time_text)
     return None, bool(time_text)
 
 
+def _format_api_dt(val: Optional[str]) -> Optional[str]:
+    """API 的 ISO 時間（2024-06-10T19:30:00[.fff][Z|+08:00]）轉成 2024/06/10 19:30。"""
+    if not val or not isinstance(val, str):
+        return None
+    raw = val.strip()
+    if not raw:
+        return None
+    clean = raw.replace("Z", "")
+    if "+" in clean:
+        clean = clean.split("+")[0]
+    # 常見的固定寬度格式直接切片（小數秒 1~6 位），不走 strptime
+    n = len(clean)
+    if (
+        (n == 19 or (21 <= n <= 26 and clean[19] == "." and clean[20:].isdigit()))
+        and clean[4] == "-" and clean[7] == "-" and clean[10] == "T" and clean[13] == ":" and clean[16] == ":"
+        and clean[0] != "0" and clean.isascii()
+        and clean[:4].isdigit() and clean[5:7].isdigit() and clean[8:10].isdigit()
+        and clean[11:13].isdigit() and clean[14:16].isdigit() and clean[17:19].isdigit()
+    ):
+        try:
+            datetime(int(clean[:4]), int(clean[5:7]), int(clean[8:10]),
+                     int(clean[11:13]), int(clean[14:16]), int(clean[17:19]))
+        except ValueError:
+            return None
+        return f"{clean[:4]}/{clean[5:7]}/{clean[8:10]} {clean[11:13]}:{clean[14:16]}"
+    for fmt in ("%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S"):
+        try:
+            dt = datetime.strptime(clean, fmt)
+            return dt.strftime("%Y/%m/%d %H:%M")
+        except ValueError:
+            continue
+    return None
+
+
+_RE_PRICE_TAGGED = re.compile(r"(?:NT\$|NT\s*\$|\$|＄|元|價格|票價)\s*([\d,]+)")
+_RE_PRICE_DIGITS = re.compile(r"\d{3,}")
+
+
 def _parse_price_value(text: Optional[str]) -> Optional[int]:
     if not text:
         return None
     raw = str(text)
-    m = re.search(r"(?:NT\$|NT\s*\$|\$|＄|元|價格|票價)\s*([\d,]+)", raw)
+    m = _RE_PRICE_TAGGED.search(raw)
     candidate = m.group(1) if m else None
     if not candidate:
-        digits = re.findall(r"\d{3,}", raw.replace(",", ""))
+        digits = _RE_PRICE_DIGITS.findall(raw.replace(",", ""))
         candidate = digits[0] if digits else None
     if not candidate:
         return None
@@ -1038,20 +1451,23 @@ def _collect_datetime_candidates(lines: List[str]) -> List[Tuple[datetime, bool,
         if _is_sale_context(line):
             pending_date = None
             continue
-        compact = re.sub(r"\s+", " ", line)
-
-        if any(ch in compact for ch in ("~", "～")):
-
+        if "~" in line or "～" in line:
             pending_date = None
             continue
+        # 沒有數字的行不可能含日期/時間，也不影響 pending_date，直接跳過
+        if not _RE_HAS_DIGIT.search(line):
+            continue
+        # 只有連續空白或非一般空白（tab、全形空白…）才需要正規化
+        compact = _RE_WS.sub(" ", line) if "  " in line or not line.isprintable() else line
+
         dt_match = _format_datetime_match(_RE_DATE.search(compact))
         if dt_match:
             dt_obj, has_time = _parse_datetime_string(dt_match)
             if dt_obj:
                 candidates.append((dt_obj, has_time, compact))
             continue
-        date_match = re.search(r"\d{4}(?:/|\.)\d{1,2}(?:/|\.)\d{1,2}|\d{4}年\d{1,2}月\d{1,2}日?", compact)
-        time_match = re.search(r"\d{1,2}[：:]\d{2}", compact)
+        date_match = _RE_DATE_ONLY.search(compact)
+        time_match = _RE_HM.search(compact)
         if date_match and not time_match:
             pending_date = _normalize_date_text(date_match.group(0))
             continue
@@ -1064,12 +1480,51 @@ def _collect_datetime_candidates(lines: List[str]) -> List[Tuple[datetime, bool,
             pending_date = None
     return candidates
 
+# 「演出地點」「活動場地」等都含「地點」或「場地」，一次 search 即可
+_RE_VENUE_KEY = re.compile("地點|場地")
+_RE_NOT_VENUE = re.compile("日期|時間|票價|售票")
+_RE_NOT_VENUE_LOOSE = re.compile("日期|時間|價|售票")
+_RE_LINE_KEY = re.compile("地點|場地|地址|Address")
+
+
+def _classify_venue_line(
+    lines: List[str],
+    idx: int,
+    not_venue: "re.Pattern[str]",
+    venues: List[str],
+    addresses: List[str],
+) -> bool:
+    """把 lines[idx] 的地址／場地候選收進 addresses/venues；回傳這行是否含「地點／場地／地址」。"""
+    line = lines[idx]
+    has_addr = "地址" in line
+    if has_addr or "Address" in line:
+        candidate = _after_colon(line)
+        if candidate:
+            addresses.append(candidate)
+    has_venue = _RE_VENUE_KEY.search(line) is not None
+    if has_venue:
+        candidate = _after_colon(line)
+        if candidate:
+            venues.append(candidate)
+        if idx + 1 < len(lines):
+            nxt = lines[idx + 1].strip()
+            if nxt and not not_venue.search(nxt):
+                venues.append(nxt)
+    return has_addr or has_venue
+
+
+def _after_colon(line: str) -> str:
+    """取全形冒號後的內容；沒有冒號就回傳整行（等同 line.split("：", 1)[-1].strip()）。"""
+    _, sep, tail = line.partition("：")
+    return (tail if sep else line).strip()
+
+
 def _clean_venue_text(text: Optional[str]) -> Optional[str]:
     if not text:
         return None
-    cleaned = re.sub(r"\s+", " ", str(text)).strip()
-    cleaned = re.sub(r"\b\d{1,2}[：:]\d{2}\b", "", cleaned)
-    cleaned = re.sub(r"[~～].*", "", cleaned)
+    cleaned = _RE_WS.sub(" ", str(text)).strip()
+    cleaned = _RE_HM_WORD.sub("", cleaned)
+    cleaned = _RE_TILDE_TAIL.sub("", cleaned)
     cleaned = cleaned.strip(" ，,、;:；：-")
     return cleaned or None
 
@@ -1078,62 +1533,188 @@ TICKET_API = "https://ticket.ibon.com.tw/api/ActivityInfo/GetGameInfoList"
 IBON_DETAIL_API = "https://ticket.ibon.com.tw/api/ActivityInfo/GetDetailData"
 
 # ================= 小工具 =================
-def soup_parse(html: str) -> BeautifulSoup:
+# 只需要 <title> 的地方（probe 的通用後備）不必建整棵樹
+_TITLE_ONLY = SoupStrainer("title")
+
+
+def soup_parse(html: str, parse_only: Optional[SoupStrainer] = None) -> BeautifulSoup:
     try:
-        return BeautifulSoup(html, "lxml")
+        return BeautifulSoup(html, _SOUP_PARSER, parse_only=parse_only)
     except Exception:
-        return BeautifulSoup(html, "html.parser")
+        return BeautifulSoup(html, "html.parser", parse_only=parse_only)
+
+def _iter_nonempty_lines(soup: Any) -> Iterator[str]:
+    """等同 [ln.strip() for ln in soup.get_text("\\n").split("\\n") if ln.strip()]，但逐段產出、不組整頁大字串。"""
+    for s in soup.strings:
+        for ln in s.split("\n"):
+            ln = ln.strip()
+            if ln:
+                yield ln
+
+def hash_state(sections: Dict[str, int], selling: List[str], sold_out: bool = False) -> str:
+    """票況變化偵測用的 64-bit 指紋（非安全用途，blake2b 8 bytes 足夠）。
 
-def hash_state(sections: Dict[str, int], selling: List[str]) -> str:
-    items = sorted((k, int(v)) for k, v in sections.items())
-    hot = sorted(selling)
-    raw = json.dumps({"num": items, "hot": hot}, ensure_ascii=False, separators=(",", ":"))
-    return hashlib.md5(raw.encode("utf-8")).hexdigest()
+    先組成一段正規化字串再一次雜湊；位元組內容與逐段 update 相同，既有 sig 不會變。
+    """
+    buf = "".join(f"{k}\x1f{v}\x1e" for k, v in sorted((k, int(v)) for k, v in sections.items()))
+    buf += "\x1d" + "".join(f"{name}\x1e" for name in sorted(selling))
+    if sold_out:
+        buf += "\x1dSO"
+    return hashlib.blake2b(buf.encode("utf-8"), digest_size=8).hexdigest()
 
+@lru_cache(maxsize=_URL_CACHE_SIZE)
 def canonicalize_url(u: str) -> str:
     p = urlparse(u.strip())
-    q = parse_qs(p.query, keep_blank_values=True)
-    q_sorted = []
-    for k in sorted(q.keys()):
-        for v in q[k]:
-            q_sorted.append((k, v))
-    new_q = urlencode(q_sorted, doseq=True)
+    # 依 key 穩定排序：同名參數維持原本先後（與 parse_qs 分組後再展開相同）
+    q_sorted = sorted(parse_qsl(p.query, keep_blank_values=True), key=itemgetter(0))
+    new_q = urlencode(q_sorted)
     return urlunparse((p.scheme, p.netloc, p.path, "", new_q, ""))
 
+# LINE push 改由背景執行緒送出，webhook / tick 不必等 LINE API 來回。
+# 同一個收件者在 100ms 內連續的訊息合併成一次 push（LINE 單次上限 5 則）；LINE_PUSH_ASYNC=0 可改回同步。
+_PUSH_ASYNC = os.getenv("LINE_PUSH_ASYNC", "1") == "1"
+_PUSH_BATCH_WINDOW = 0.1
+_PUSH_BATCH_MAX = 5
+_PUSH_QUEUE: "queue.Queue[Any]" = queue.Queue()
+_PUSH_STOP = object()
+_PUSH_THREAD: Optional[threading.Thread] = None
+_PUSH_THREAD_LOCK = threading.Lock()
+
+
+def _is_push_rejected(exc: Exception) -> bool:
+    """LINE 明確拒收這次請求（400）；逾時、429、5xx 等可能其實已送達，不算。"""
+    return LineBotApiError is not None and isinstance(exc, LineBotApiError) and exc.status_code == 400
+
+
+def _deliver_push(to_id: str, messages: List[Any]) -> None:
+    try:
+        line_bot_api.push_message(to_id, messages if len(messages) > 1 else messages[0])
+        return
+    except Exception as e:
+        _get_logger().error(f"[LINE] push failed ({len(messages)} msg): {e}")
+        if len(messages) <= 1 or not _is_push_rejected(e):
+            return
+    # 合併送出時只要一則被 LINE 拒收（例如圖片網址不合規）整包都會 400：改逐則重送。
+    # 其他錯誤不重送，以免 LINE 其實已收下而重複通知
+    for msg in messages:
+        try:
+            line_bot_api.push_message(to_id, msg)
+        except Exception as e:
+            _get_logger().error(f"[LINE] push retry failed: {e}")
+
+
+def _push_worker() -> None:
+    carry: Any = None
+    while True:
+        item = carry if carry is not None else _PUSH_QUEUE.get()
+        carry = None
+        if item is _PUSH_STOP:
+            _PUSH_QUEUE.task_done()
+            return
+        to_id, msg = item
+        batch = [msg]
+        deadline = time.monotonic() + _PUSH_BATCH_WINDOW
+        while len(batch) < _PUSH_BATCH_MAX:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                nxt = _PUSH_QUEUE.get(timeout=remaining)
+            except queue.Empty:
+                break
+            # 換了收件者、或訊息種類不同（圖片不和票況文字同包，避免圖片被拒時連文字一起掉）：
+            # 留到下一輪，維持送出順序
+            if nxt is _PUSH_STOP or nxt[0] != to_id or type(nxt[1]) is not type(msg):
+                carry = nxt
+                break
+            batch.append(nxt[1])
+        try:
+            _deliver_push(to_id, batch)
+        finally:
+            for _ in batch:
+                _PUSH_QUEUE.task_done()
+
+
+def _ensure_push_worker() -> None:
+    global _PUSH_THREAD
+    if _PUSH_THREAD is not None and _PUSH_THREAD.is_alive():
+        return
+    with _PUSH_THREAD_LOCK:
+        if _PUSH_THREAD is None or not _PUSH_THREAD.is_alive():
+            _PUSH_THREAD = threading.Thread(target=_push_worker, daemon=True, name="line-push")
+            _PUSH_THREAD.start()
+
+
+def _enqueue_push(to_id: str, message: Any) -> None:
+    if not _PUSH_ASYNC:
+        _deliver_push(to_id, [message])
+        return
+    _ensure_push_worker()
+    _PUSH_QUEUE.put((to_id, message))
+
+
+def _flush_line_pushes(timeout: float = 10.0) -> bool:
+    """等佇列裡的 push 送完（最多 timeout 秒）；回傳是否已清空。"""
+    with _PUSH_QUEUE.all_tasks_done:
+        return _PUSH_QUEUE.all_tasks_done.wait_for(lambda: _PUSH_QUEUE.unfinished_tasks == 0, timeout)
+
+
+@atexit.register
+def _stop_push_worker() -> None:
+    if _PUSH_THREAD is not None and _PUSH_THREAD.is_alive():
+        _PUSH_QUEUE.put(_PUSH_STOP)
+        _PUSH_THREAD.join(timeout=5)
+
+
 def send_text(to_id: str, text: str):
     if not line_bot_api:
         _get_logger().info(f"[dry-run] send_text to {to_id}: {text}")
         return
-    try:
-        line_bot_api.push_message(to_id, TextSendMessage(text=text))
-    except Exception as e:
-        _get_logger().error(f"[LINE] push text failed: {e}")
+    _enqueue_push(to_id, TextSendMessage(text=text))
 
 def send_image(to_id: str, img_url: str):
     if not line_bot_api:
         _get_logger().info(f"[dry-run] send_image to {to_id}: {img_url}")
         return
-    try:
-        line_bot_api.push_message(
-            to_id,
-            ImageSendMessage(original_content_url=img_url, preview_image_url=img_url)
-        )
-    except Exception as e:
-        _get_logger().error(f"[LINE] push image failed: {e}")
+    _enqueue_push(to_id, ImageSendMessage(original_content_url=img_url, preview_image_url=img_url))
+
+
+# webhook / cron / LIFF 的背景工作共用固定大小的執行緒池，突發大量事件時不會無限開 thread；
+# 排隊超過 BACKGROUND_MAX_PENDING 就直接拒收（呼叫端回 ok=False）
+_BACKGROUND_POOL = ThreadPoolExecutor(
+    max_workers=max(1, int(os.getenv("WEBHOOK_WORKERS", "32"))), thread_name_prefix="background"
+)
+_BACKGROUND_MAX_PENDING = max(1, int(os.getenv("BACKGROUND_MAX_PENDING", "500")))
+_BACKGROUND_PENDING = 0
+_BACKGROUND_LOCK = threading.Lock()
 
 
 def _spawn_background_worker(app_obj: Flask, name: str, target, *args, **kwargs) -> bool:
-    def _runner():
-        with app_obj.app_context():
-            try:
-                target(*args, **kwargs)
-            except Exception as exc:  # pragma: no cover - background logging
-                app_obj.logger.exception(f"[background] {name} crashed: {exc}")
+    global _BACKGROUND_PENDING
 
+    def _runner():
+        global _BACKGROUND_PENDING
+        try:
+            with app_obj.app_context():
+                try:
+                    target(*args, **kwargs)
+                except Exception as exc:  # pragma: no cover - background logging
+                    app_obj.logger.exception(f"[background] {name} crashed: {exc}")
+        finally:
+            with _BACKGROUND_LOCK:
+                _BACKGROUND_PENDING -= 1
+
+    with _BACKGROUND_LOCK:
+        if _BACKGROUND_PENDING >= _BACKGROUND_MAX_PENDING:
+            _get_logger().warning(f"[background] backlog full ({_BACKGROUND_PENDING}), drop {name}")
+            return False
+        _BACKGROUND_PENDING += 1
     try:
-        threading.Thread(target=_runner, daemon=True, name=name).start()
+        _BACKGROUND_POOL.submit(_runner)
         return True
     except Exception as exc:
+        with _BACKGROUND_LOCK:
+            _BACKGROUND_PENDING -= 1
         _get_logger().exception(f"[background] unable to start {name}: {exc}")
         return False
 
@@ -1153,14 +1734,7 @@ def _push_detail_to_chat(chat_id: Optional[str], detail: Optional[Dict[str, Any]
         _get_logger().error(f"[push] failed to deliver result: {exc}")
 
 def sess_default() -> requests.Session:
-    s = requests.Session()
-    s.headers.update({
-        "User-Agent": UA,
-        "Accept-Language": "zh-TW,zh;q=0.9,en;q=0.6",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Connection": "close",
-    })
-    return s
+    return _shared_session()
 
 
 DEFAULT_HTTP_TIMEOUT = (3.0, 6.0)
@@ -1171,13 +1745,66 @@ def http_get(sess: requests.Session, url: str, **kwargs) -> requests.Response:
     return sess.get(url, **kwargs)
 
 
+# 圖片/連結探活專用連線池（對象多半是各家 CDN，host 數比 ibon API 多）
+_HEAD_SESSION: Optional[requests.Session] = None
+_HEAD_SESSION_LOCK = threading.Lock()
+# 這些 host 的 HEAD 回 403/405 就代表真的拿不到，不必再補一次 GET。
+# 預設為空：確認過某個 host 的 HEAD 拒絕是確定結果，才由維運以環境變數加入
+_NO_HEAD_FALLBACK = {
+    h.strip().lower()
+    for h in os.getenv("URL_OK_NO_GET_FALLBACK_HOSTS", "").split(",")
+    if h.strip()
+}
+
+
+def _head_session() -> requests.Session:
+    global _HEAD_SESSION
+    if _HEAD_SESSION is not None:
+        return _HEAD_SESSION
+    with _HEAD_SESSION_LOCK:
+        if _HEAD_SESSION is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            s.headers.update({"User-Agent": UA})
+            _HEAD_SESSION = s
+    return _HEAD_SESSION
+
+
+# _url_ok 結果快取：url -> (到期時間, 結果)；可用的連結記 24 小時，失敗的 5 分鐘後再試
+_URL_OK_CACHE: Dict[str, Tuple[float, bool]] = {}
+_URL_OK_CACHE_LOCK = threading.Lock()
+_URL_OK_CACHE_MAX = 2048
+_URL_OK_TTL_OK = 24 * 3600
+_URL_OK_TTL_FAIL = 300
+
+
 def _url_ok(u: str) -> bool:
     if not u or not u.startswith("http"):
         return False
+    now = time.time()
+    with _URL_OK_CACHE_LOCK:
+        hit = _URL_OK_CACHE.get(u)
+    if hit and hit[0] > now:
+        return hit[1]
+    ok = _probe_url(u)
+    with _URL_OK_CACHE_LOCK:
+        _URL_OK_CACHE.pop(u, None)
+        _URL_OK_CACHE[u] = (now + (_URL_OK_TTL_OK if ok else _URL_OK_TTL_FAIL), ok)
+        while len(_URL_OK_CACHE) > _URL_OK_CACHE_MAX:
+            _URL_OK_CACHE.pop(next(iter(_URL_OK_CACHE)))
+    return ok
+
+
+def _probe_url(u: str) -> bool:
     try:
-        r = requests.head(u, timeout=6, allow_redirects=True)
-        if r.status_code in (403, 405):  # 某些 CDN 禁 HEAD
-            r = requests.get(u, stream=True, timeout=8)
+        s = _head_session()
+        r = s.head(u, timeout=6, allow_redirects=True)
+        # 某些 CDN 禁 HEAD：改用串流 GET 只讀 header，用完立刻把連線還回池子
+        if r.status_code in (403, 405) and (urlparse(u).hostname or "").lower() not in _NO_HEAD_FALLBACK:
+            r = s.get(u, stream=True, timeout=8)
+            r.close()
         return 200 <= r.status_code < 400
     except Exception:
         return False
@@ -1186,16 +1813,33 @@ def _first_http_url(s: str) -> Optional[str]:
     m = re.search(r'https?://[^\s"\'<>]+', str(s))
     return m.group(0) if m else None
 
+# 依優先順序：ActivityImage 路徑 > azureedge CDN > img.ibon
+_ACTIVITY_IMAGE_SOURCES = (
+    r"https?://[^\"'<>]+/image/ActivityImage/[^\s\"'<>]+\.(?:jpg|jpeg|png)",
+    r"https?://ticketimg2\.azureedge\.net/[^\s\"'<>]+\.(?:jpg|jpeg|png)",
+    r"https?://img\.ibon\.com\.tw/[^\s\"'<>]+\.(?:jpg|jpeg|png)",
+)
+_ACTIVITY_IMAGE_PATTERNS = [re.compile(p, re.I) for p in _ACTIVITY_IMAGE_SOURCES]
+_ACTIVITY_IMG_RE = re.compile("|".join(f"({p})" for p in _ACTIVITY_IMAGE_SOURCES), re.I)
+
 def find_activity_image_any(s: str) -> Optional[str]:
-    m = re.search(r"https?://[^\"'<>]+/image/ActivityImage/[^\s\"'<>]+\.(?:jpg|jpeg|png)", s, flags=re.I)
-    if m: return m.group(0)
-    m = re.search(r"https?://ticketimg2\.azureedge\.net/[^\s\"'<>]+\.(?:jpg|jpeg|png)", s, flags=re.I)
-    if m: return m.group(0)
-    m = re.search(r"https?://img\.ibon\.com\.tw/[^\s\"'<>]+\.(?:jpg|jpeg|png)", s, flags=re.I)
-    return m.group(0) if m else None
+    # 合併成一條 alternation 先掃一次：沒命中代表三條都不會中；命中第一優先就是答案
+    m = _ACTIVITY_IMG_RE.search(s)
+    if not m:
+        return None
+    if m.lastindex == 1:
+        return m.group(0)
+    # 先命中的是較低優先的樣式：從該位置起依序重掃（更前面不可能有任何一條命中）
+    start = m.start()
+    for pat in _ACTIVITY_IMAGE_PATTERNS:
+        m = pat.search(s, start)
+        if m:
+            return m.group(0)
+    return None
 
-def find_details_url_candidates_from_html(html: str, base: str) -> List[str]:
-    soup = soup_parse(html)
+def find_details_url_candidates_from_html(html: str, base: str, soup: Optional[BeautifulSoup] = None) -> List[str]:
+    if soup is None:
+        soup = soup_parse(html)
     urls: set[str] = set()
     for a in soup.select('a[href*="ActivityInfo/Details"]'):
         href = (a.get("href") or "").strip()
@@ -1205,15 +1849,18 @@ def find_details_url_candidates_from_html(html: str, base: str) -> List[str]:
         urls.add(urljoin("https://ticket.ibon.com.tw", m.group(0)))
     return list(urls)
 
+_DECODE_MAX_CANDIDATES = 64
+
 def _try_decode_ticket_target(val: str) -> Optional[str]:
     if not val:
         return None
 
-    queue: List[str] = [val]
+    pending: deque[str] = deque([val])
     seen: set[str] = set()
 
-    while queue:
-        cur = queue.pop(0)
+    # 最多展開 _DECODE_MAX_CANDIDATES 個候選，避免惡意/異常字串無限 unquote/base64
+    while pending and len(seen) < _DECODE_MAX_CANDIDATES:
+        cur = pending.popleft()
         if cur in seen:
             continue
         seen.add(cur)
@@ -1231,18 +1878,19 @@ def _try_decode_ticket_target(val: str) -> Optional[str]:
 
         unquoted = unquote(cur)
         if unquoted != cur and unquoted not in seen:
-            queue.append(unquoted)
+            pending.append(unquoted)
 
         padded = cur + "=" * ((4 - len(cur) % 4) % 4)
         try:
             decoded = base64.b64decode(padded).decode("utf-8", errors="ignore")
             if decoded and decoded not in seen:
-                queue.append(decoded)
+                pending.append(decoded)
         except Exception:
             pass
 
     return None
 
+@lru_cache(maxsize=_URL_CACHE_SIZE)
 def _unwrap_go_ticket_url(u: str) -> Optional[str]:
     if not u:
         return None
@@ -1271,6 +1919,9 @@ def _unwrap_go_ticket_url(u: str) -> Optional[str]:
 
     return None
 
+_UTK_RESOLVE_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="utk-resolve")
+
+
 def _resolve_utk_url(
     activity_id: Optional[str],
     pattern: Optional[str],
@@ -1296,6 +1947,7 @@ def _resolve_utk_url(
         {},
     ]
 
+    queries: List[Dict[str, str]] = []
     for combo in combos:
         query: Dict[str, str] = {"ActivityID": str(activity_id)}
         if pattern:
@@ -1303,74 +1955,102 @@ def _resolve_utk_url(
         for key, val in combo.items():
             if val is not None:
                 query[key] = val
+        queries.append(query)
+
+    def _try_query(query: Dict[str, str]) -> Optional[str]:
+        start = time.time()
+        status: Optional[int] = None
+        reason: Optional[str] = None
+        resolved: Optional[str] = None
+        request_url: Optional[str] = None
+        try:
 
-        for attempt in range(len(UTK_BACKOFF)):
-            start = time.time()
-            status: Optional[int] = None
-            reason: Optional[str] = None
-            resolved: Optional[str] = None
-            request_url: Optional[str] = None
-            try:
-
-                resp = http_get(
-                    sess,
-
-                    base_url,
-                    params=query,
-                    headers=headers,
-                    allow_redirects=True,
-                    timeout=6,
-
-                )
-                status = resp.status_code
-                request_url = resp.url
-
-                final_url = resp.url or ""
-                if final_url and "UTK0201_000" in final_url.upper():
-                    resolved = final_url
-                elif 200 <= status < 400:
-                    html_blob = read_html_safely(resp)
-                    urls = _extract_ticket_urls_from_text(html_blob)
-                    if urls:
-                        resolved = urls[0]
-                    elif resp.history:
-                        for hist in reversed(resp.history):
-                            loc = hist.headers.get("Location") or ""
-                            candidate = _unwrap_go_ticket_url(loc) or urljoin(IBON_HOST, loc)
-                            if candidate and "UTK0201_000" in candidate.upper():
-                                resolved = candidate
-                                break
+            resp = http_get(
+                sess,
 
-                else:
-                    reason = f"http={status}"
-            except Exception as exc:
-                reason = str(exc)
-
-            if not resolved and not reason:
-                reason = "no-ticket-url"
-
-            elapsed_ms = int((time.time() - start) * 1000)
-            if trace is not None:
-                trace.append(
-                    {
-                        "phase": "utk_resolve",
-                        "ok": bool(resolved),
-                        "url": request_url or base_url,
-                        "status": status or 0,
-                        "elapsed_ms": elapsed_ms,
-                        "count": 1 if resolved else 0,
-                        "reason": reason,
-                    }
-                )
+                base_url,
+                params=query,
+                headers=headers,
+                allow_redirects=True,
+                timeout=6,
 
-            if resolved:
-                return resolved
+            )
+            status = resp.status_code
+            request_url = resp.url
+
+            final_url = resp.url or ""
+            if final_url and "UTK0201_000" in final_url.upper():
+                resolved = final_url
+            elif 200 <= status < 400:
+                html_blob = read_html_safely(resp)
+                urls = _extract_ticket_urls_from_text(html_blob)
+                if urls:
+                    resolved = urls[0]
+                elif resp.history:
+                    for hist in reversed(resp.history):
+                        loc = hist.headers.get("Location") or ""
+                        candidate = _unwrap_go_ticket_url(loc) or urljoin(IBON_HOST, loc)
+                        if candidate and "UTK0201_000" in candidate.upper():
+                            resolved = candidate
+                            break
 
-            backoff = UTK_BACKOFF[min(attempt, len(UTK_BACKOFF) - 1)]
-            time.sleep(backoff)
+            else:
+                reason = f"http={status}"
+        except Exception as exc:
+            reason = str(exc)
+
+        if not resolved and not reason:
+            reason = "no-ticket-url"
+
+        elapsed_ms = int((time.time() - start) * 1000)
+        if trace is not None:
+            trace.append(
+                {
+                    "phase": "utk_resolve",
+                    "ok": bool(resolved),
+                    "url": request_url or base_url,
+                    "status": status or 0,
+                    "elapsed_ms": elapsed_ms,
+                    "count": 1 if resolved else 0,
+                    "reason": reason,
+                }
+            )
+        return resolved
+
+    # 各組參數同時打；排越前面的組合越優先，只有在更優先的都失敗後才採用後面的結果。
+    # 一輪全數失敗才退避重試（最後一輪後不再睡）。
+    for attempt in range(len(UTK_BACKOFF)):
+        futures = {_UTK_RESOLVE_POOL.submit(_try_query, q): i for i, q in enumerate(queries)}
+        results: Dict[int, Optional[str]] = {}
+        best: Optional[int] = None
+        for fut in as_completed(futures):
+            idx = futures[fut]
+            try:
+                results[idx] = fut.result()
+            except Exception:
+                results[idx] = None
+            if results[idx] and (best is None or idx < best):
+                best = idx
+            if best is not None and all(i in results for i in range(best)):
+                for other in futures:
+                    other.cancel()
+                return results[best]
+        if attempt + 1 < len(UTK_BACKOFF):
+            time.sleep(UTK_BACKOFF[attempt])
 
     return None
 
+_TICKET_PATTERNS = [
+    re.compile(p, re.I)
+    for p in (
+        r'https?://[^\s"\'<>]+UTK0201_000[^\s"\'<>]*',
+        r'//orders\.ibon\.com\.tw/[^\s"\'<>]*UTK0201_000[^\s"\'<>]*',
+        r'/Application/UTK02/UTK0201_000\.aspx[^\s"\'<>]*',
+        r'/UTK02/UTK0201_000\.aspx[^\s"\'<>]*',
+    )
+]
+_RE_GO_TICKET_URL = re.compile(r'(?:https?://ticket\.ibon\.com\.tw)?/ActivityInfo/GoTicketURL[^\s"\'<>]+', re.I)
+
 def _extract_ticket_urls_from_text(text: str) -> List[str]:
     if not text:
         return []
@@ -1390,35 +2070,34 @@ def _extract_ticket_urls_from_text(text: str) -> List[str]:
         if url not in found:
             found.append(url)
 
-    patterns = [
-        r'https?://[^\s"\'<>]+UTK0201_000[^\s"\'<>]*',
-        r'//orders\.ibon\.com\.tw/[^\s"\'<>]*UTK0201_000[^\s"\'<>]*',
-        r'/Application/UTK02/UTK0201_000\.aspx[^\s"\'<>]*',
-        r'/UTK02/UTK0201_000\.aspx[^\s"\'<>]*',
-    ]
-
-    for pat in patterns:
-        for m in re.finditer(pat, text, flags=re.I):
+    for pat in _TICKET_PATTERNS:
+        for m in pat.finditer(text):
             _append(m.group(0))
 
-    for m in re.finditer(r'(?:https?://ticket\.ibon\.com\.tw)?/ActivityInfo/GoTicketURL[^\s"\'<>]+', text, flags=re.I):
+    for m in _RE_GO_TICKET_URL.finditer(text):
         unwrapped = _unwrap_go_ticket_url(m.group(0))
         if unwrapped:
             _append(unwrapped)
 
     return found
 
-def _extract_details_any(html: str) -> List[str]:
-    """盡可能把 /ActivityInfo/Details/<id> 都撿出來（避免只靠固定版型）。"""
+_RE_ACTIVITY_JSON_ID = re.compile(r'ActivityInfoId"\s*:\s*(\d+)|ActivityId"\s*:\s*(\d+)')
+
+def _extract_details_any(html: str, soup: Optional[BeautifulSoup] = None) -> List[str]:
+    """盡可能把 /ActivityInfo/Details/<id> 都撿出來（避免只靠固定版型）。
+
+    呼叫端已經 parse 過同一份 html 時可直接傳 soup 進來，省一次整頁解析。
+    """
     urls: List[str] = []
 
     # 1) 直接正則掃全頁
-    for m in re.finditer(r'(?i)(?:https?://ticket\.ibon\.com\.tw)?/ActivityInfo/Details/(\d+)', html):
+    for m in _RE_DETAILS_LINK.finditer(html):
         urls.append(urljoin(IBON_BASE, m.group(0)))
 
     # 2) 拿 a[href]（有時候 href 是相對路徑）
     try:
-        soup = soup_parse(html)
+        if soup is None:
+            soup = soup_parse(html)
         for a in soup.select('a[href*="ActivityInfo/Details"]'):
             href = (a.get("href") or "").strip()
             if href:
@@ -1427,7 +2106,7 @@ def _extract_details_any(html: str) -> List[str]:
         pass
 
     # 3) script 內 JSON/字串
-    for m in re.finditer(r'ActivityInfoId"\s*:\s*(\d+)|ActivityId"\s*:\s*(\d+)', html):
+    for m in _RE_ACTIVITY_JSON_ID.finditer(html):
         gid = next(g for g in m.groups() if g)
         urls.append(f"https://ticket.ibon.com.tw/ActivityInfo/Details/{gid}")
 
@@ -1440,31 +2119,75 @@ def _extract_details_any(html: str) -> List[str]:
     return out
 
 # ---------- 活動資訊與圖片（API/Details） ----------
+_RE_API_DATETIME = re.compile(r"(\d{4})[-/](\d{1,2})[-/](\d{1,2})[\sT]+(\d{1,2}):(\d{2})")
+
+# key 命中哪些欄位只跟 key 字串有關：依序比對 token，結果以 LRU 記住
+_ACTIVITY_FIELD_TOKENS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("title", ("activityname", "gamename", "title", "actname", "activity_title", "name")),
+    ("place", ("placename", "venue", "place", "site", "location")),
+    ("dt", ("starttime", "startdatetime", "gamedatetime", "gamedate", "begindatetime", "datetime")),
+    ("poster", ("image", "poster")),
+)
+
+
+@lru_cache(maxsize=1024)
+def _activity_fields_for_key(kl: str) -> Tuple[str, ...]:
+    return tuple(field for field, tokens in _ACTIVITY_FIELD_TOKENS if any(t in kl for t in tokens))
+
+
 def _deep_pick_activity_info(data: Any) -> Dict[str, str]:
     out: Dict[str, Optional[str]] = {"title": None, "place": None, "dt": None, "poster": None}
-    def walk(x):
+
+    def walk(x) -> bool:
+        """回傳 True 代表四個欄位都已填滿，可以提早結束。"""
         if isinstance(x, dict):
             for k, v in x.items():
-                kl = str(k).lower()
-                if not out["title"] and any(t in kl for t in ("activityname","gamename","title","actname","activity_title","name")):
-                    if isinstance(v, str) and v.strip(): out["title"] = v.strip()
-                if not out["place"] and any(t in kl for t in ("placename","venue","place","site","location")):
-                    if isinstance(v, str) and v.strip(): out["place"] = v.strip()
-                if not out["dt"] and any(t in kl for t in ("starttime","startdatetime","gamedatetime","gamedate","begindatetime","datetime")):
-                    s = str(v)
-                    m = re.search(r"(\d{4})[-/](\d{1,2})[-/](\d{1,2})[\sT]+(\d{1,2}):(\d{2})", s)
-                    if m:
-                        out["dt"] = f"{int(m.group(1))}/{int(m.group(2)):02d}/{int(m.group(3)):02d} {int(m.group(4)):02d}:{m.group(5)}"
-                if not out["poster"] and ("image" in kl or "poster" in kl):
-                    url = _first_http_url(v) if isinstance(v, str) else None
-                    if url: out["poster"] = url
-            for v in x.values(): walk(v)
+                for field in _activity_fields_for_key(str(k).lower()):
+                    if out[field]:
+                        continue
+                    if field == "dt":
+                        m = _RE_API_DATETIME.search(str(v))
+                        if m:
+                            out["dt"] = f"{int(m.group(1))}/{int(m.group(2)):02d}/{int(m.group(3)):02d} {int(m.group(4)):02d}:{m.group(5)}"
+                    elif field == "poster":
+                        url = _first_http_url(v) if isinstance(v, str) else None
+                        if url: out["poster"] = url
+                    elif isinstance(v, str) and v.strip():
+                        out[field] = v.strip()
+            if None not in out.values():
+                return True
+            for v in x.values():
+                if walk(v):
+                    return True
         elif isinstance(x, list):
-            for it in x: walk(it)
+            for it in x:
+                if walk(it):
+                    return True
+        return False
+
     walk(data)
     return {k: v for k, v in out.items() if v}
 
+# GetGameInfoList 結果快取：(perf_id, product_id, canonical referer) -> (ts, info)
+_GAME_INFO_CACHE: Dict[Tuple[str, str, str], Tuple[float, Dict[str, Any]]] = {}
+_GAME_INFO_CACHE_MAX = 256
+_GAME_INFO_CACHE_LOCK = threading.Lock()
+
+
+def _copy_game_info(info: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: (list(v) if isinstance(v, list) else v) for k, v in info.items()}
+
+
 def fetch_game_info_from_api(perf_id: Optional[str], product_id: Optional[str], referer_url: str, sess: requests.Session) -> Dict[str, str]:
+    try:
+        cache_key = (perf_id or "", product_id or "", canonicalize_url(referer_url) if referer_url else "")
+    except Exception:
+        cache_key = (perf_id or "", product_id or "", referer_url or "")
+    with _GAME_INFO_CACHE_LOCK:
+        hit = _GAME_INFO_CACHE.get(cache_key)
+    if hit and time.time() - hit[0] < _CACHE_TTL:
+        return _copy_game_info(hit[1])
+
     session, token = _prepare_ibon_session()
     if session is None:
         return {}
@@ -1486,7 +2209,8 @@ def fetch_game_info_from_api(perf_id: Optional[str], product_id: Optional[str],
 
     def add_payload(**kwargs):
         payload = {k: v for k, v in kwargs.items() if v not in (None, "", [])}
-        key = tuple(sorted(payload.items()))
+        # 後端綁定參數不分大小寫：PerformanceId / PERFORMANCEID 視為同一組，只送第一種寫法
+        key = tuple(sorted((k.lower(), v) for k, v in payload.items()))
         if key in payload_keys:
             return
         payload_keys.add(key)
@@ -1503,8 +2227,9 @@ def fetch_game_info_from_api(perf_id: Optional[str], product_id: Optional[str],
         act = _activity_id_from_url(referer_url)
         if act:
             activity_ids.append(act)
-    if perf_id and perf_id in PROMO_DETAILS_MAP:
-        act = _activity_id_from_url(PROMO_DETAILS_MAP[perf_id])
+    promo_details = promo_details_map()
+    if perf_id and perf_id in promo_details:
+        act = _activity_id_from_url(str(promo_details[perf_id]))
         if act:
             activity_ids.append(act)
 
@@ -1543,12 +2268,12 @@ def fetch_game_info_from_api(perf_id: Optional[str], product_id: Optional[str],
 
         if resp.status_code == 200:
             try:
-                data = resp.json()
+                data = _resp_json(resp)
             except Exception as e:
                 _get_logger().info(f"[api] bad json ({params}): {e}")
                 continue
 
-            text_blob = json.dumps(data, ensure_ascii=False)
+            text_blob = _json_text_blob(resp, data)
             info = _deep_pick_activity_info(data)
 
             act_id = None
@@ -1574,29 +2299,28 @@ def fetch_game_info_from_api(perf_id: Optional[str], product_id: Optional[str],
                     info["poster"] = promo
 
             ticket_urls = _extract_ticket_urls_from_text(text_blob)
-            for t in ticket_urls:
-                if t not in all_ticket_urls:
-                    all_ticket_urls.append(t)
+            all_ticket_urls.extend(ticket_urls)
             if ticket_urls and not info.get("ticket_urls"):
                 info["ticket_urls"] = ticket_urls
 
+            needles = [n for n in (perf_id, product_id) if n]
+
             def match_obj(obj: Any) -> bool:
                 if not isinstance(obj, (dict, list)):
                     return False
-                blob = json.dumps(obj, ensure_ascii=False)
-                ok = True
-                if perf_id:
-                    ok = ok and (perf_id in blob)
-                if product_id:
-                    ok = ok and (product_id in blob)
-                return ok
-
-            if isinstance(data, list):
+                if not needles:
+                    return True
+                blob = _json_dumps(obj)
+                return all(n in blob for n in needles)
+
+            # id 出現在任一子物件，就必然出現在整包 text_blob：整包都找不到時，逐筆 dumps 也不可能命中
+            matchable = all(n in text_blob for n in needles)
+            if matchable and isinstance(data, list):
                 for it in data:
                     if match_obj(it):
                         info.update(_deep_pick_activity_info(it))
                         break
-            elif isinstance(data, dict):
+            elif matchable and isinstance(data, dict):
                 for v in data.values():
                     if isinstance(v, list):
                         for it in v:
@@ -1614,7 +2338,7 @@ def fetch_game_info_from_api(perf_id: Optional[str], product_id: Optional[str],
                 break
 
         elif resp.status_code in (401, 403, 419):
-            session, token = _prepare_ibon_session()
+            session, token = _prepare_ibon_session(refresh=True)
             if session is None:
                 break
             headers = {
@@ -1632,35 +2356,120 @@ def fetch_game_info_from_api(perf_id: Optional[str], product_id: Optional[str],
 
     if all_ticket_urls:
         existing = picked.get("ticket_urls") if picked else None
-        merged: List[str] = []
-        for src in (existing if isinstance(existing, list) else []) + all_ticket_urls:
-            if src not in merged:
-                merged.append(src)
+        merged: List[str] = list(dict.fromkeys((existing if isinstance(existing, list) else []) + all_ticket_urls))
         if picked:
             picked["ticket_urls"] = merged
         else:
             picked = {"ticket_urls": merged}
 
+    if picked:
+        with _GAME_INFO_CACHE_LOCK:
+            _GAME_INFO_CACHE.pop(cache_key, None)
+            _GAME_INFO_CACHE[cache_key] = (time.time(), _copy_game_info(picked))
+            while len(_GAME_INFO_CACHE) > _GAME_INFO_CACHE_MAX:
+                _GAME_INFO_CACHE.pop(next(iter(_GAME_INFO_CACHE)))
     return picked
 
+# API content HTML 裡的「地點：xxx」：先找冒號後直接接文字，再找冒號後隔一個標籤的寫法
+_CONTENT_PLACE_PATTERNS = (
+    re.compile(r"(?:演出|活動)?地點[：:]+\s*([^<\n\r]+)", re.I),
+    re.compile(r"(?:演出|活動)?地點[：:][^<]*<[^>]*>([^<]+)", re.I),
+)
+
+# Details 頁條件式 GET：url -> (ETag, Last-Modified, html)；304 時沿用上次的 html
+_DETAILS_HTML_CACHE: Dict[str, Tuple[Optional[str], Optional[str], str]] = {}
+_DETAILS_HTML_CACHE_MAX = 128
+_DETAILS_HTML_CACHE_LOCK = threading.Lock()
+
+
+def _remember_details_html(url: str, resp: requests.Response, html: str) -> None:
+    etag = resp.headers.get("ETag")
+    last_modified = resp.headers.get("Last-Modified")
+    with _DETAILS_HTML_CACHE_LOCK:
+        _DETAILS_HTML_CACHE.pop(url, None)
+        if not (etag or last_modified):
+            return
+        _DETAILS_HTML_CACHE[url] = (etag, last_modified, html)
+        while len(_DETAILS_HTML_CACHE) > _DETAILS_HTML_CACHE_MAX:
+            _DETAILS_HTML_CACHE.pop(next(iter(_DETAILS_HTML_CACHE)))
+
+
+def _ensure_https(url: Optional[str]) -> Optional[str]:
+    """圖片網址一律轉成 https；// 開頭補 scheme，其餘（相對路徑、data: 等）回 None。"""
+    if not url:
+        return None
+    val = (url if isinstance(url, str) else str(url)).strip()
+    if val.startswith("https://"):
+        return val
+    if val.startswith("http://"):
+        return "https://" + val[7:]
+    if val.startswith("//"):
+        return "https:" + val
+    return None
+
+
+# fetch_from_ticket_details 結果短期快取：輪詢同一批活動時，TTL 內直接沿用（不含 session，sess 不影響結果）
+_DETAILS_RESULT_TTL = float(os.getenv("DETAILS_RESULT_TTL_SEC", "45"))
+_DETAILS_RESULT_CACHE: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+_DETAILS_RESULT_CACHE_MAX = 256
+_DETAILS_RESULT_CACHE_LOCK = threading.Lock()
+
+
+def _copy_details_info(info: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        k: (list(v) if isinstance(v, list) else dict(v) if isinstance(v, dict) else v)
+        for k, v in info.items()
+    }
+
+
 def fetch_from_ticket_details(details_url: str, sess: requests.Session) -> Dict[str, Any]:
+    key = sanitize_details_url(details_url)
+    if _DETAILS_RESULT_TTL > 0:
+        with _DETAILS_RESULT_CACHE_LOCK:
+            hit = _DETAILS_RESULT_CACHE.get(key)
+        if hit and time.time() - hit[0] < _DETAILS_RESULT_TTL:
+            return _copy_details_info(hit[1])
+
+    result = _fetch_from_ticket_details_uncached(key, sess)
+    # 只剩 details_url/pattern 代表抓取失敗，不快取，下次重試
+    if _DETAILS_RESULT_TTL > 0 and set(result) - {"details_url", "pattern"}:
+        with _DETAILS_RESULT_CACHE_LOCK:
+            _DETAILS_RESULT_CACHE.pop(key, None)
+            _DETAILS_RESULT_CACHE[key] = (time.time(), _copy_details_info(result))
+            while len(_DETAILS_RESULT_CACHE) > _DETAILS_RESULT_CACHE_MAX:
+                _DETAILS_RESULT_CACHE.pop(next(iter(_DETAILS_RESULT_CACHE)))
+    return result
+
+
+def _fetch_from_ticket_details_uncached(details_url: str, sess: requests.Session) -> Dict[str, Any]:
     clean_details = sanitize_details_url(details_url)
     details_url = clean_details
     out: Dict[str, Any] = {"details_url": details_url}
     ticket_urls: List[str] = []
-    parsed_details = urlparse(details_url)
-    pattern = (parse_qs(parsed_details.query).get("pattern", ["ENTERTAINMENT"])[0] or "ENTERTAINMENT").strip() or "ENTERTAINMENT"
+    pattern = (_url_query_fields(details_url)[2] or "ENTERTAINMENT").strip() or "ENTERTAINMENT"
     out["pattern"] = pattern
 
     detail_html: Optional[str] = None
     html_lines: List[str] = []
     api_dt_values: List[Tuple[str, int]] = []
     try:
-
-        resp = http_get(sess, details_url, timeout=6)
-
-        if resp.status_code == 200:
+        with _DETAILS_HTML_CACHE_LOCK:
+            cached = _DETAILS_HTML_CACHE.get(details_url)
+        cond_headers: Dict[str, str] = {}
+        if cached:
+            if cached[0]:
+                cond_headers["If-None-Match"] = cached[0]
+            if cached[1]:
+                cond_headers["If-Modified-Since"] = cached[1]
+
+        resp = http_get(sess, details_url, headers=cond_headers or None, timeout=6)
+
+        if resp.status_code == 304 and cached:
+            detail_html = cached[2]
+        elif resp.status_code == 200:
             detail_html = read_html_safely(resp)
+            _remember_details_html(details_url, resp, detail_html)
+        if detail_html is not None:
             html_summary = _extract_remaining_tickets_from_html(detail_html)
             if html_summary:
                 out.setdefault("remaining_tickets", html_summary)
@@ -1679,23 +2488,6 @@ def fetch_from_ticket_details(details_url: str, sess: requests.Session) -> Dict[
         except Exception:
             return u
 
-    def _format_api_dt(val: Optional[str]) -> Optional[str]:
-        if not val or not isinstance(val, str):
-            return None
-        raw = val.strip()
-        if not raw:
-            return None
-        clean = raw.replace("Z", "")
-        if "+" in clean:
-            clean = clean.split("+")[0]
-        for fmt in ("%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S"):
-            try:
-                dt = datetime.strptime(clean, fmt)
-                return dt.strftime("%Y/%m/%d %H:%M")
-            except ValueError:
-                continue
-        return None
-
     activity_id = _activity_id_from_url(details_url)
     if activity_id:
         out.setdefault("activity_id", str(activity_id))
@@ -1713,6 +2505,7 @@ def fetch_from_ticket_details(details_url: str, sess: requests.Session) -> Dict[
                 "Origin": "https://ticket.ibon.com.tw",
                 "Referer": details_url,
                 "X-Requested-With": "XMLHttpRequest",
+                "Accept": "application/json, text/plain, */*",
             }
             if token:
                 headers["X-XSRF-TOKEN"] = token
@@ -1724,13 +2517,13 @@ def fetch_from_ticket_details(details_url: str, sess: requests.Session) -> Dict[
                     timeout=10,
                 )
                 if resp.status_code == 200:
-                    data = resp.json()
+                    data = _resp_json(resp)
                     item = data.get("Item") if isinstance(data, dict) else None
                     if isinstance(item, dict):
                         api_item = item
                     break
                 if resp.status_code in (401, 403, 419):
-                    session, token = _prepare_ibon_session()
+                    session, token = _prepare_ibon_session(refresh=True)
                     continue
                 if 500 <= resp.status_code < 600:
                     _get_logger().info(f"[details-api] http={resp.status_code}")
@@ -1743,6 +2536,7 @@ def fetch_from_ticket_details(details_url: str, sess: requests.Session) -> Dict[
     content_html = ""
     text_venue_candidates: List[str] = []
     text_address_candidates: List[str] = []
+    place_line_idx: List[int] = []
 
     if api_item:
         if api_item.get("ActivityID"):
@@ -1783,31 +2577,22 @@ def fetch_from_ticket_details(details_url: str, sess: requests.Session) -> Dict[
         if content_html:
             try:
                 regex_place = None
-                m = re.search(r'(?:演出|活動)?地點[：:]+\s*([^<\n\r]+)', content_html, flags=re.I)
-                if m:
-                    regex_place = re.sub(r"\s+", " ", m.group(1)).strip()
-                if not regex_place:
-                    m = re.search(r'(?:演出|活動)?地點[：:][^<]*<[^>]*>([^<]+)', content_html, flags=re.I)
+                for pat in _CONTENT_PLACE_PATTERNS:
+                    m = pat.search(content_html)
                     if m:
-                        regex_place = re.sub(r"\s+", " ", m.group(1)).strip()
+                        regex_place = _RE_WS.sub(" ", m.group(1)).strip()
+                    if regex_place:
+                        break
                 if regex_place:
                     out.setdefault("place", regex_place)
 
                 soup = soup_parse(content_html)
-                content_lines = [ln.strip() for ln in soup.get_text("\n").split("\n") if ln.strip()]
+                content_lines = list(_iter_nonempty_lines(soup))
                 for idx, line in enumerate(content_lines):
-                    if "地址" in line or "Address" in line:
-                        candidate = line.split("：", 1)[-1].strip()
-                        if candidate:
-                            text_address_candidates.append(candidate)
-                    if any(key in line for key in ("地點", "場地", "演出地點", "活動地點")):
-                        candidate = line.split("：", 1)[-1].strip() if "：" in line else line
-                        if candidate:
-                            text_venue_candidates.append(candidate)
-                        if idx + 1 < len(content_lines):
-                            nxt = content_lines[idx + 1].strip()
-                            if nxt and not any(k in nxt for k in ("日期", "時間", "票價", "售票")):
-                                text_venue_candidates.append(nxt)
+                    if _RE_LINE_KEY.search(line) and _classify_venue_line(
+                        content_lines, idx, _RE_NOT_VENUE, text_venue_candidates, text_address_candidates
+                    ):
+                        place_line_idx.append(idx)
                 if not out.get("poster"):
                     img = soup.find("img")
                     if img and img.get("src"):
@@ -1825,26 +2610,18 @@ def fetch_from_ticket_details(details_url: str, sess: requests.Session) -> Dict[
     if detail_html:
         try:
             soup = soup_parse(detail_html)
-            html_lines = [ln.strip() for ln in soup.get_text("\n").split("\n") if ln.strip()]
-            if html_lines:
-                seen_lines = set(content_lines)
-                for line in html_lines:
-                    if line not in seen_lines:
-                        content_lines.append(line)
-                        seen_lines.add(line)
+            html_lines = list(_iter_nonempty_lines(soup))
+            # 合併進 content_lines 與抽取地址／場地候選同一趟完成
+            seen_lines = set(content_lines)
             for idx, line in enumerate(html_lines):
-                if "地址" in line or "Address" in line:
-                    candidate = line.split("：", 1)[-1].strip()
-                    if candidate:
-                        text_address_candidates.append(candidate)
-                if any(key in line for key in ("地點", "場地", "演出地點", "活動地點")):
-                    candidate = line.split("：", 1)[-1].strip() if "：" in line else line
-                    if candidate:
-                        text_venue_candidates.append(candidate)
-                    if idx + 1 < len(html_lines):
-                        nxt = html_lines[idx + 1].strip()
-                        if nxt and not any(k in nxt for k in ("日期", "時間", "價", "售票")):
-                            text_venue_candidates.append(nxt)
+                is_new = line not in seen_lines
+                if is_new:
+                    content_lines.append(line)
+                    seen_lines.add(line)
+                if _RE_LINE_KEY.search(line) and _classify_venue_line(
+                    html_lines, idx, _RE_NOT_VENUE_LOOSE, text_venue_candidates, text_address_candidates
+                ) and is_new:
+                    place_line_idx.append(len(content_lines) - 1)
 
             if not out.get("poster"):
                 for sel in [
@@ -1875,7 +2652,7 @@ def fetch_from_ticket_details(details_url: str, sess: requests.Session) -> Dict[
                         out["title"] = t
 
             if not out.get("place"):
-                title_html, place_html, _ = extract_title_place_from_html(detail_html)
+                title_html, place_html, _ = extract_title_place_from_html(detail_html, soup, want_dt=False)
                 if place_html:
                     out["place"] = place_html
                 if title_html and not out.get("title"):
@@ -1887,83 +2664,57 @@ def fetch_from_ticket_details(details_url: str, sess: requests.Session) -> Dict[
 
 
     # 透過內容文字補齊場地
+    # place_line_idx 已記下 content_lines 中含地點類關鍵字的行，不必再整份掃一遍
     if content_lines:
         if not out.get("place"):
-            for idx, line in enumerate(content_lines):
-                if any(key in line for key in ("地點", "場地", "地址")):
-                    candidate = line.split("：", 1)[-1].strip()
-                    if candidate and candidate != line and len(candidate) > 2:
-                        out["place"] = candidate
-                        break
-                    for j in range(idx + 1, len(content_lines)):
-                        nxt = content_lines[j].strip()
-                        if not nxt:
-                            continue
-                        if nxt.endswith("："):
-                            continue
-                        if any(key in nxt for key in ("日期", "時間", "票價", "售票")):
-                            continue
-                        out["place"] = nxt
-                        break
-                    if out.get("place"):
-                        break
-
-    def _ensure_https(url: Optional[str]) -> Optional[str]:
-        if not url:
-            return None
-        val = str(url).strip()
-        if not val:
-            return None
-        if val.startswith("//"):
-            val = "https:" + val
-        if val.startswith("http://"):
-            val = "https://" + val[len("http://"):]
-        if not val.startswith("https://"):
-            return None
-        return val
+            for idx in place_line_idx:
+                line = content_lines[idx]
+                candidate = _after_colon(line)
+                if candidate and candidate != line and len(candidate) > 2:
+                    out["place"] = candidate
+                    break
+                for j in range(idx + 1, len(content_lines)):
+                    nxt = content_lines[j].strip()
+                    if not nxt:
+                        continue
+                    if nxt.endswith("："):
+                        continue
+                    if _RE_NOT_VENUE.search(nxt):
+                        continue
+                    out["place"] = nxt
+                    break
+                if out.get("place"):
+                    break
 
-    image_candidates: List[str] = []
+    final_image = None
     poster_val = out.get("poster")
     if poster_val:
-        image_candidates.append(str(poster_val))
-    final_image = None
-    for img in image_candidates:
-        norm = img
-        if norm and not norm.startswith("http"):
+        norm: Optional[str] = str(poster_val)
+        if not norm.startswith("http"):
             norm = _abs_url(norm)
-        norm = _ensure_https(norm)
-        if norm:
-            final_image = norm
-            break
-    if not final_image:
-        final_image = LOGO
-    out["poster"] = final_image
-    out["image_url"] = final_image
+        final_image = _ensure_https(norm)
+    out["poster"] = out["image_url"] = final_image or LOGO
 
     # datetime candidates derived from API values and page text
     dt_candidates: List[Tuple[int, datetime, bool]] = []
+    add_dt = dt_candidates.append
 
-    def _add_dt_candidate(raw: Optional[str], priority: int):
-        if not raw or not isinstance(raw, str):
-            return
+    # api_dt_values 只會放 _format_api_dt 產生的非空字串，不必再檢查型別
+    for raw, priority in api_dt_values:
         dt_obj, has_time = _parse_datetime_string(raw)
         if dt_obj:
-            dt_candidates.append((priority, dt_obj, has_time))
-
-    for raw, priority in api_dt_values:
-        _add_dt_candidate(raw, priority)
+            add_dt((priority, dt_obj, has_time))
 
     for dt_obj, has_time, line_text in _collect_datetime_candidates(content_lines):
         if not line_text:
-            dt_candidates.append((2, dt_obj, has_time))
+            add_dt((2, dt_obj, has_time))
             continue
         if _is_sale_context(line_text):
             continue
         line_priority = 2
-        lower_line = line_text.lower()
-        if any(keyword.lower() in lower_line for keyword in _EVENT_DATE_KEYWORDS):
+        if _RE_EVENT_DATE_KEYWORD.search(line_text.lower()):
             line_priority = 0
-        dt_candidates.append((line_priority, dt_obj, has_time))
+        add_dt((line_priority, dt_obj, has_time))
 
     seen_dt: set[tuple] = set()
     dedup_dt: List[Tuple[int, datetime, bool]] = []
@@ -2004,15 +2755,8 @@ def fetch_from_ticket_details(details_url: str, sess: requests.Session) -> Dict[
         if cleaned:
             venue_candidates.append((1, cleaned))
 
-    final_venue = None
-    seen_names: set[str] = set()
-    for priority, name in sorted(venue_candidates, key=lambda x: (x[0], len(x[1]))):
-        key = name.lower()
-        if key in seen_names:
-            continue
-        seen_names.add(key)
-        final_venue = name
-        break
+    # 只取排序後的第一名；min() 對同分者同樣保留先出現的那筆
+    final_venue = min(venue_candidates, key=lambda x: (x[0], len(x[1])))[1] if venue_candidates else None
 
     if final_venue:
         out["place"] = final_venue
@@ -2042,11 +2786,7 @@ def fetch_from_ticket_details(details_url: str, sess: requests.Session) -> Dict[
         out["title"] = str(out["title"]).strip()
 
     if ticket_urls:
-        uniq: List[str] = []
-        for t in ticket_urls:
-            if t not in uniq:
-                uniq.append(t)
-        out["ticket_urls"] = uniq
+        out["ticket_urls"] = list(dict.fromkeys(ticket_urls))
 
     cleaned: Dict[str, Any] = {}
     for key, value in out.items():
@@ -2064,18 +2804,31 @@ def fetch_from_ticket_details(details_url: str, sess: requests.Session) -> Dict[
             cleaned[key] = value
     return cleaned
 
+def _first_datetime_in_html(html: str) -> Optional[str]:
+    return _format_datetime_match(_RE_DATE.search(html))
+
 # ---- 圖片（宣傳圖 + 座位圖）----
-def pick_event_images_from_000(html: str, base_url: str) -> Tuple[str, Optional[str]]:
+def pick_event_images_from_000(html: str, base_url: str, soup: Optional[BeautifulSoup] = None) -> Tuple[str, Optional[str]]:
     poster = LOGO
     seatmap = None
     try:
-        soup = soup_parse(html)
+        if soup is None:
+            soup = soup_parse(html)
+        # <img> 只走一次：同時記下第一張座位圖與第一張像宣傳圖的（同一張可兩者皆是）
+        img_poster = None
         for img in soup.find_all("img"):
             src = (img.get("src") or "").strip()
-            if src and "static_bigmap" in src.lower():
-                seatmap = urljoin(base_url, src); break
+            if not src:
+                continue
+            lo = src.lower()
+            if seatmap is None and "static_bigmap" in lo:
+                seatmap = urljoin(base_url, src)
+            if img_poster is None and any(k in lo for k in ("activityimage","azureedge","adimage")):
+                img_poster = urljoin(base_url, src)
+            if seatmap and img_poster:
+                break
         if not seatmap:
-            m = re.search(r'https?://[^\s"\'<>]+static_bigmap[^\s"\'<>]+?\.(?:jpg|jpeg|png)', html, flags=re.I)
+            m = _RE_SEATMAP_URL.search(html)
             if m: seatmap = m.group(0)
 
         promo = find_activity_image_any(html)
@@ -2086,23 +2839,24 @@ def pick_event_images_from_000(html: str, base_url: str) -> Tuple[str, Optional[
                 m = soup.select_one(sel)
                 if m and m.get("content"):
                     poster = urljoin(base_url, m["content"]); break
-            if poster == LOGO:
-                for img in soup.find_all("img"):
-                    src = (img.get("src") or "").strip()
-                    if src and any(k in src.lower() for k in ("activityimage","azureedge","adimage")):
-                        poster = urljoin(base_url, src); break
+            if poster == LOGO and img_poster:
+                poster = img_poster
     except Exception as e:
         _get_logger().warning(f"[image] pick failed: {e}")
     return poster, seatmap
 
-def extract_title_place_from_html(html: str) -> tuple[Optional[str], Optional[str], Optional[str]]:
-    soup = soup_parse(html)
+def extract_title_place_from_html(
+    html: str, soup: Optional[BeautifulSoup] = None, want_dt: bool = True
+) -> tuple[Optional[str], Optional[str], Optional[str]]:
+    """want_dt=False 時不掃整份 HTML 找日期（第三個值固定為 None），給用不到日期的呼叫端。"""
+    if soup is None:
+        soup = soup_parse(html)
 
     title: Optional[str] = None
     place: Optional[str] = None
     dt_text: Optional[str] = None
 
-    for gt in soup.select('.grid-title'):
+    for gt in (soup.select('.grid-title') if "grid-title" in html else ()):
         lab = gt.get_text(" ", strip=True)
         sib = gt.find_next_sibling()
         if not sib:
@@ -2115,7 +2869,7 @@ def extract_title_place_from_html(html: str) -> tuple[Optional[str], Optional[st
             title = content
 
         if any(k in lab for k in ("活動地點", "地點", "場地")) and not place:
-            place = re.sub(r"\s+", " ", content).strip()
+            place = _RE_WS.sub(" ", content).strip()
 
     if not title:
         m = soup.select_one('[id$="_NAME"]')
@@ -2134,65 +2888,79 @@ def extract_title_place_from_html(html: str) -> tuple[Optional[str], Optional[st
         if mt and mt.get("content"):
             title = mt["content"].strip()
 
-    dt_text = _format_datetime_match(_RE_DATE.search(html)) or dt_text
+    if want_dt:
+        dt_text = _first_datetime_in_html(html) or dt_text
 
     return title, place, dt_text
 
 # ============= 票區與 live.map 解析 =============
-def extract_area_meta_from_000(html: str) -> Tuple[Dict[str, str], Dict[str, str], Dict[str, int], Dict[str, int], Dict[str, int]]:
+def extract_area_meta_from_000(html: str, soup: Optional[BeautifulSoup] = None) -> Tuple[Dict[str, str], Dict[str, str], Dict[str, int], Dict[str, int], Dict[str, int]]:
     name_map: Dict[str, str] = {}
     status_map: Dict[str, str] = {}
     qty_map: Dict[str, int] = {}
     order_map: Dict[str, int] = {}
     price_map: Dict[str, int] = {}
 
-    soup = soup_parse(html)
+    # 兩種來源都有固定字樣；原始 HTML 沒出現就不必走 DOM（也不必 parse）
+    has_json = "jsonData" in html
+    has_rows = "PERFORMANCE_PRICE_AREA_ID=" in html
+    if not (has_json or has_rows):
+        return name_map, status_map, qty_map, order_map, price_map
+    if soup is None:
+        soup = soup_parse(html)
 
-    # (a) script jsonData
-    for sc in soup.find_all("script"):
+    # (a) script jsonData（票區可能上百筆，常用方法先綁成區域變數）
+    set_name = name_map.setdefault
+    set_status = status_map.setdefault
+    set_qty = qty_map.setdefault
+    set_order = order_map.setdefault
+    set_price = price_map.setdefault
+    parse_price = _parse_price_value
+    find_digits = _RE_DIGITS.findall
+    for sc in (soup.find_all("script") if has_json else ()):
         s = sc.string or sc.text or ""
-        m = re.search(r"jsonData\s*=\s*'(\[.*?\])'", s, flags=re.S)
+        if "jsonData" not in s:
+            continue
+        m = _RE_JSONDATA.search(s)
         if not m:
             continue
         try:
-            arr = json.loads(m.group(1))
+            raw_json = m.group(1)
+            try:
+                arr = _json_loads(raw_json)
+            except ValueError:  # orjson 比 json 嚴格（NaN 等），退回標準庫
+                arr = json.loads(raw_json)
             for it in arr:
                 code = (it.get("PERFORMANCE_PRICE_AREA_ID") or "").strip()
                 name = (it.get("NAME") or "").strip()
                 amt  = (it.get("AMOUNT") or "").strip()
                 srt  = it.get("SORT")
                 if code and name:
-                    name_map.setdefault(code, re.sub(r"\s+", "", name))
+                    set_name(code, _RE_WS.sub("", name))
                 if code and amt:
-                    status_map.setdefault(code, amt)
-                    nums = [int(x) for x in re.findall(r"\d+", amt) if int(x) < 1000]
+                    set_status(code, amt)
+                    nums = [n for n in map(int, find_digits(amt)) if n < 1000]
                     if nums:
-                        qty_map.setdefault(code, nums[-1])
-                    price_val = _parse_price_value(amt)
+                        set_qty(code, nums[-1])
+                    price_val = parse_price(amt)
                     if price_val is not None:
-                        price_map.setdefault(code, price_val)
+                        set_price(code, price_val)
                 if code:
-                    price_fields = [
-                        it.get("PRICE"),
-                        it.get("Price"),
-                        it.get("PRICE_TEXT"),
-                        it.get("PriceText"),
-                    ]
-                    for pf in price_fields:
-                        price_val = _parse_price_value(pf)
+                    for field in ("PRICE", "Price", "PRICE_TEXT", "PriceText"):
+                        price_val = parse_price(it.get(field))
                         if price_val is not None:
-                            price_map.setdefault(code, price_val)
+                            set_price(code, price_val)
                             break
                 if code and isinstance(srt, int):
-                    order_map.setdefault(code, srt)
+                    set_order(code, srt)
         except Exception:
             pass
 
     # (b) 表格列
     row_idx = 0
-    for a in soup.select('a[href*="PERFORMANCE_PRICE_AREA_ID="]'):
+    for a in (soup.select('a[href*="PERFORMANCE_PRICE_AREA_ID="]') if has_rows else ()):
         href = a.get("href", "")
-        m = re.search(r'PERFORMANCE_PRICE_AREA_ID=([A-Za-z0-9]+)', href)
+        m = _RE_AREA_ID_PARAM.search(href)
         if not m:
             continue
         code = m.group(1)
@@ -2208,24 +2976,20 @@ def extract_area_meta_from_000(html: str) -> Tuple[Dict[str, str], Dict[str, str
             if code not in name_map:
                 cand = None
                 for t in tds:
-                    if re.search(r"(樓|區|包廂)", t):
+                    if _RE_AREA_NAME_HINT.search(t):
                         cand = t; break
                 if not cand:
                     cand = tds[0]
-                name_map[code] = re.sub(r"\s+", "", cand)
+                name_map[code] = _RE_WS.sub("", cand)
 
-            status_cell = ""
-            for t in reversed(tds):
-                if ("已售完" in t) or ("熱賣" in t) or re.search(r"\b\d{1,3}\b", t):
-                    status_cell = t
-                    break
+            status_cell = next((t for t in reversed(tds) if _RE_STATUS_CELL.search(t)), "")
             if status_cell:
                 if code not in status_map:
                     if "已售完" in status_cell:
                         status_map[code] = "已售完"
                     elif "熱賣" in status_cell:
                         status_map[code] = "熱賣中"
-                nums = [int(x) for x in re.findall(r"\d+", status_cell) if int(x) < 1000]
+                nums = [n for n in map(int, _RE_DIGITS.findall(status_cell)) if n < 1000]
                 if nums and code not in qty_map:
                     qty_map[code] = nums[-1]
                 price_val = _parse_price_value(status_cell)
@@ -2245,33 +3009,30 @@ def _parse_livemap_text(txt: str) -> Tuple[Dict[str, int], int]:
     sections: Dict[str, int] = {}
     for tag in _RE_AREA_TAG.findall(txt):
         code = None
-        m = re.search(
-            r"javascript:Send\([^)]*'(?:B0[0-9A-Z]{6,10})'\s*,\s*'(B0[0-9A-Z]{6,10})'",
-            tag, re.I
-        )
+        m = _RE_SEND_CODE.search(tag)
         if m: code = m.group(1)
         if not code:
-            m = re.search(r'(?:data-(?:area|area-id|price-area-id))=["\'](B0[0-9A-Z]{6,10})["\']', tag, re.I)
+            m = _RE_DATA_AREA.search(tag)
             if m: code = m.group(1)
         if not code:
             continue
 
         qty = None
-        m = re.search(r'\bdata-(?:left|remain|qty|count)=["\']?(\d{1,3})["\']?', tag, re.I)
+        m = _RE_DATA_QTY.search(tag)
         if m:
             qty = int(m.group(1))
 
         if qty is None:
             text = ""
-            m = re.search(r'title="([^"]*)"', tag, re.I)
+            m = _RE_TITLE_ATTR.search(tag)
             if m: text = m.group(1)
             if not text:
-                m = re.search(r'(?:alt|aria-label)=["\']([^"\']*)["\']', tag, re.I)
+                m = _RE_ALT_LABEL.search(tag)
                 if m: text = m.group(1)
             if text:
-                m = re.search(r'(?:剩餘|尚餘|可售|可購)[^\d]{0,6}(\d{1,3})', text)
+                m = _RE_LIVEMAP_REMAIN.search(text)
                 if not m:
-                    m = re.search(r'(\d{1,3})\s*張', text)
+                    m = _RE_ZHANG.search(text)
                 if m:
                     qty = int(m.group(1))
 
@@ -2291,7 +3052,7 @@ def _interpret_utk_status(text: Optional[str]) -> Tuple[Optional[int], str]:
     if not raw:
         return None, ""
 
-    digits = [int(m.group(0)) for m in re.finditer(r"\d+", raw) if m.group(0)]
+    digits = [int(m.group(0)) for m in _RE_DIGITS.finditer(raw) if m.group(0)]
     if digits:
         return digits[-1], "可售"
 
@@ -2304,12 +3065,13 @@ def _interpret_utk_status(text: Optional[str]) -> Tuple[Optional[int], str]:
     return None, raw
 
 
-def _extract_utk_summary_from_html(html: str) -> Dict[str, str]:
+def _extract_utk_summary_from_html(html: str, soup: Optional[BeautifulSoup] = None) -> Dict[str, str]:
     summary: Dict[str, str] = {}
-    try:
-        soup = soup_parse(html)
-    except Exception:
-        return summary
+    if soup is None:
+        try:
+            soup = soup_parse(html)
+        except Exception:
+            return summary
 
     title_node = soup.select_one("h1") or soup.select_one(".ticketTitle")
     if title_node:
@@ -2317,8 +3079,7 @@ def _extract_utk_summary_from_html(html: str) -> Dict[str, str]:
         if title_text:
             summary["title"] = title_text
 
-    raw_lines = [ln.strip() for ln in soup.get_text("\n").split("\n") if ln.strip()]
-    lines = raw_lines[:120]
+    lines = list(islice(_iter_nonempty_lines(soup), 120))
 
     dt_candidates: List[Tuple[datetime, bool]] = []
     for dt_obj, has_time, raw in _collect_datetime_candidates(lines):
@@ -2334,8 +3095,8 @@ def _extract_utk_summary_from_html(html: str) -> Dict[str, str]:
     for line in lines:
         if _is_sale_context(line):
             continue
-        if any(kw in line for kw in ("演出地點", "活動地點", "演出場地", "活動場地", "地點", "場地")):
-            candidate = line.split("：", 1)[-1].strip() if "：" in line else line
+        if _RE_VENUE_KEY.search(line):
+            candidate = _after_colon(line)
             cleaned = _clean_venue_text(candidate)
             if cleaned:
                 summary.setdefault("venue", cleaned)
@@ -2345,7 +3106,7 @@ def _extract_utk_summary_from_html(html: str) -> Dict[str, str]:
         if _is_sale_context(line):
             continue
         if "地址" in line:
-            candidate = line.split("：", 1)[-1].strip() if "：" in line else line
+            candidate = _after_colon(line)
             if candidate:
                 summary.setdefault("address", candidate)
                 break
@@ -2353,11 +3114,12 @@ def _extract_utk_summary_from_html(html: str) -> Dict[str, str]:
     return summary
 
 
-def _extract_utk_ticket_rows(html: str) -> List[Dict[str, Any]]:
-    try:
-        soup = soup_parse(html)
-    except Exception:
-        return []
+def _extract_utk_ticket_rows(html: str, soup: Optional[BeautifulSoup] = None) -> List[Dict[str, Any]]:
+    if soup is None:
+        try:
+            soup = soup_parse(html)
+        except Exception:
+            return []
 
     results: List[Dict[str, Any]] = []
     for table in soup.find_all("table"):
@@ -2403,13 +3165,14 @@ _RE_REMAINING_NUM = re.compile(r"(?:尚餘|剩餘|可售|可購買|餘票|票量
 _RE_TOTAL_NUM = re.compile(r"(?:總(?:計)?|共(?:有)?|全部)[^\d]{0,6}(\d{1,4})\s*張")
 
 
-def _extract_remaining_tickets_from_html(html: Optional[str]) -> Optional[Dict[str, Any]]:
+def _extract_remaining_tickets_from_html(html: Optional[str], soup: Optional[BeautifulSoup] = None) -> Optional[Dict[str, Any]]:
     if not html:
         return None
 
     text = ""
     try:
-        soup = soup_parse(html)
+        if soup is None:
+            soup = soup_parse(html)
         text = soup.get_text("\n")
     except Exception:
         text = re.sub(r"<[^>]+>", " ", html)
@@ -2448,10 +3211,34 @@ def _extract_remaining_tickets_from_html(html: Optional[str]) -> Optional[Dict[s
     return None
 
 
+_RE_PLAIN_INT = re.compile(r"\s*[+-]?\d+\s*")
+
+
+def _sum_ticket_remaining(tickets: Any) -> int:
+    """加總各票種 remaining（負數視為 0）；有任一筆不是整數就回 0，與原本 int() 失敗整體歸零相同。"""
+    total = 0
+    for t in tickets or ():
+        if not isinstance(t, dict):
+            continue
+        v = t.get("remaining", 0)
+        if isinstance(v, int):
+            n = v
+        elif isinstance(v, str) and _RE_PLAIN_INT.fullmatch(v):
+            n = int(v)
+        elif isinstance(v, float) and v == v and v not in (float("inf"), float("-inf")):
+            n = int(v)
+        else:
+            return 0
+        if n > 0:
+            total += n
+    return total
+
+
 def _summarize_remaining_tickets(
     tickets: Optional[List[Dict[str, Any]]],
     html: Optional[str],
     url: Optional[str] = None,
+    soup: Optional[BeautifulSoup] = None,
 ) -> Optional[Dict[str, Any]]:
     if not tickets and not html:
         return None
@@ -2481,40 +3268,55 @@ def _summarize_remaining_tickets(
         logger.debug(f"[remaining] detected sold out status for {url}")
         return summary
 
-    fallback = _extract_remaining_tickets_from_html(html)
+    fallback = _extract_remaining_tickets_from_html(html, soup)
     if fallback:
         logger.debug(f"[remaining] html fallback triggered for {url}: {fallback}")
     return fallback
 
 
-def try_fetch_livemap_by_perf(perf_id: str, sess: requests.Session, html: Optional[str] = None) -> Tuple[Dict[str, int], int]:
+_LIVEMAP_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="livemap")
+_RE_IMAGES_BASE = re.compile(r'(https?://.*/images/[^/]+/)')
+
+
+def try_fetch_livemap_by_perf(perf_id: str, sess: requests.Session, seatmap: Optional[str] = None) -> Tuple[Dict[str, int], int]:
     if not perf_id:
         return {}, 0
     bases = [f"https://qwareticket-asysimg.azureedge.net/QWARE_TICKET/images/Temp/{perf_id}/"]
-    if html:
-        poster, seatmap = pick_event_images_from_000(html, "https://orders.ibon.com.tw/")
-        if seatmap:
-            m = re.match(r'(https?://.*/images/[^/]+/)', seatmap)
-            if m: bases.insert(0, m.group(1))
+    # seatmap 由呼叫端從已解析的 000 頁面取得，這裡不再重新 parse
+    if seatmap:
+        m = _RE_IMAGES_BASE.match(seatmap)
+        if m: bases.insert(0, m.group(1))
     prefixes = ["", "1_", "2_", "3_", "01_", "02_", "03_"]
-    tried = set()
-    for base in bases:
-        for pref in prefixes:
-            url = f"{base}{pref}{perf_id}_live.map"
-            if url in tried: continue
-            tried.add(url)
-            try:
-                _get_logger().info(f"[livemap] try {url}")
+    urls = list(dict.fromkeys(f"{base}{pref}{perf_id}_live.map" for base in bases for pref in prefixes))
 
-                r = http_get(sess, url, timeout=12)
-                if r.status_code == 200:
-                    html = _decode_ibon_html(r)
-                    if "<area" in html:
-                        _get_logger().info(f"[livemap] hit {url}")
+    def _probe(url: str) -> Optional[str]:
+        try:
+            _get_logger().info(f"[livemap] try {url}")
+            r = http_get(sess, url, timeout=12)
+            # 先在原始 bytes 找 <area，沒有就不必整包解碼
+            if r.status_code == 200 and b"<area" in r.content:
+                return _decode_ibon_html(r)
+        except Exception as e:
+            _get_logger().info(f"[livemap] miss {url}: {e}")
+        return None
 
-                        return _parse_livemap_text(html)
-            except Exception as e:
-                _get_logger().info(f"[livemap] miss {url}: {e}")
+    # 候選網址同時打；排越前面越優先，只有在更優先的都落空後才採用後面的結果。
+    futures = {_LIVEMAP_POOL.submit(_probe, u): i for i, u in enumerate(urls)}
+    results: Dict[int, Optional[str]] = {}
+    best: Optional[int] = None
+    for fut in as_completed(futures):
+        idx = futures[fut]
+        try:
+            results[idx] = fut.result()
+        except Exception:
+            results[idx] = None
+        if results[idx] and (best is None or idx < best):
+            best = idx
+        if best is not None and all(i in results for i in range(best)):
+            for other in futures:
+                other.cancel()
+            _get_logger().info(f"[livemap] hit {urls[best]}")
+            return _parse_livemap_text(results[best])
     return {}, 0
 
 # （可選）進第二步票區頁補抓數字
@@ -2532,9 +3334,9 @@ def fetch_area_left_from_utk0101(base_000_url: str, perf_id: str, product_id: st
         if r.status_code != 200:
             return None
         html = read_html_safely(r)
-        m = re.search(r'(?:剩餘|尚餘|可購買|可售)[^\d]{0,6}(\d{1,3})', html)
+        m = _RE_AREA_LEFT_REMAIN.search(html)
         if not m:
-            m = re.search(r'(\d{1,3})\s*張', html)
+            m = _RE_ZHANG.search(html)
         if m:
             return int(m.group(1))
 
@@ -2551,6 +3353,9 @@ def fetch_area_left_from_utk0101(base_000_url: str, perf_id: str, product_id: st
         return None
 
 # --------- 主要解析器 ---------
+# parse_UTK0201_000 的背景預取（live.map）；與 _LIVEMAP_POOL 分開，避免等待自己池內的工作
+_UTK_PREFETCH_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="utk-prefetch")
+
 def parse_UTK0201_000(url: str, sess: requests.Session, referer: Optional[str] = None) -> dict:
     out = {"ok": False, "sig": "NA", "url": url, "image": LOGO}
     headers = {
@@ -2565,18 +3370,21 @@ def parse_UTK0201_000(url: str, sess: requests.Session, referer: Optional[str] =
         out["msg"] = f"讀取失敗（HTTP {r.status_code}）"
         return out
     html = _decode_ibon_html(r)
+    # 同一份 000 頁面只 parse 一次，下面各個抽取函式共用
+    soup = soup_parse(html)
 
-    summary_info = _extract_utk_summary_from_html(html)
+    summary_info = _extract_utk_summary_from_html(html, soup)
 
 
-    q = parse_qs(urlparse(url).query)
-    perf_id = (q.get("PERFORMANCE_ID") or [None])[0]
-    product_id = (q.get("PRODUCT_ID") or [None])[0]
+    perf_id, product_id, _ = _url_query_fields(url)
 
     # 圖片
-    poster_from_000, seatmap = pick_event_images_from_000(html, url)
+    poster_from_000, seatmap = pick_event_images_from_000(html, url, soup)
     if seatmap: out["seatmap"] = seatmap
 
+    # live.map 探測只需要 perf_id 與座位圖網址，先丟到背景，和下面的 API / Details 請求重疊
+    livemap_future = _UTK_PREFETCH_POOL.submit(try_fetch_livemap_by_perf, perf_id, sess, seatmap=seatmap)
+
     # 活動基本資訊
     api_info: Dict[str, str] = {}
     try:
@@ -2584,20 +3392,20 @@ def parse_UTK0201_000(url: str, sess: requests.Session, referer: Optional[str] =
     except Exception as e:
         _get_logger().info(f"[api] fail: {e}")
 
-    html_title, html_place, html_dt = extract_title_place_from_html(html)
+    html_title, html_place, _ = extract_title_place_from_html(html, soup, want_dt=False)
 
-    html_details = find_details_url_candidates_from_html(html, url)
+    html_details = find_details_url_candidates_from_html(html, url, soup)
     details_url = (
         (html_details[0] if html_details else None)
         or api_info.get("details")
-        or (PROMO_DETAILS_MAP.get(perf_id) if perf_id else None)
+        or (promo_details_map().get(perf_id) if perf_id else None)
     )
     details_info: Dict[str, str] = {}
     if details_url:
         details_info = fetch_from_ticket_details(details_url, sess)
 
     chosen_img = (
-        (PROMO_IMAGE_MAP.get(perf_id) if perf_id else None)
+        (promo_image_map().get(perf_id) if perf_id else None)
         or details_info.get("poster")
         or api_info.get("poster")
         or poster_from_000
@@ -2627,7 +3435,7 @@ def parse_UTK0201_000(url: str, sess: requests.Session, referer: Optional[str] =
         or details_info.get("dt")
         or details_info.get("date")
         or api_info.get("dt")
-        or html_dt
+        or _first_datetime_in_html(html)  # 前面都沒有才掃整份 000 HTML
         or "（未取到日期）"
     )
     if summary_info.get("address"):
@@ -2638,21 +3446,16 @@ def parse_UTK0201_000(url: str, sess: requests.Session, referer: Optional[str] =
         out["address"] = api_info["address"]
 
     # 票區中文名 + 狀態（AMOUNT）+ 順序
-    area_name_map, area_status_map, area_qty_map, area_order_map, area_price_map = extract_area_meta_from_000(html)
+    area_name_map, area_status_map, area_qty_map, area_order_map, area_price_map = extract_area_meta_from_000(html, soup)
     out["area_names"] = area_name_map
 
     # live.map 數字（僅取可信數字，且同一區取最大值）
-    sections_by_code, _ = try_fetch_livemap_by_perf(perf_id, sess, html=html)
+    sections_by_code, _ = livemap_future.result()
     numeric_counts: Dict[str, int] = dict(sections_by_code)
     for code, n in area_qty_map.items():
         if isinstance(n, int) and n > 0 and code not in numeric_counts:
             numeric_counts[code] = n
 
-    selling_unknown_codes: List[str] = []
-    for code, status in area_status_map.items():
-        if (status and ("熱賣" in status or "可售" in status)) and not numeric_counts.get(code):
-            selling_unknown_codes.append(code)
-
     if FOLLOW_AREAS_PER_CHECK > 0 and perf_id and product_id and area_name_map:
         need_follow = [code for code, st in area_status_map.items()
                        if (st and "熱賣" in st) and (code not in numeric_counts)]
@@ -2663,7 +3466,7 @@ def parse_UTK0201_000(url: str, sess: requests.Session, referer: Optional[str] =
 
     selling_unknown_codes = [
         code for code, amt in area_status_map.items()
-        if (amt and ("熱賣" in amt or "可售" in amt)) and not numeric_counts.get(code)
+        if (amt and _RE_SELLING.search(amt)) and not numeric_counts.get(code)
     ]
 
     human_numeric: Dict[str, int] = {}
@@ -2672,10 +3475,16 @@ def parse_UTK0201_000(url: str, sess: requests.Session, referer: Optional[str] =
         v = int(n)
         human_numeric[name] = max(human_numeric.get(name, 0), v)
 
+    # 名稱 -> 該名稱所有票區代碼中最小的順序（先建反查表，排序時 O(1) 取值）
+    name_to_min_order: Dict[str, int] = {}
+    for c, nm in area_name_map.items():
+        o = area_order_map.get(c, 99999)
+        prev = name_to_min_order.get(nm)
+        if prev is None or o < prev:
+            name_to_min_order[nm] = o
+
     def order_key(name: str) -> tuple:
-        codes = [c for c, nm in area_name_map.items() if nm == name]
-        order_vals = [area_order_map.get(c, 99999) for c in codes] or [99999]
-        return (min(order_vals), name)
+        return (name_to_min_order.get(name, 99999), name)
 
     ordered_names = sorted(human_numeric.keys(), key=order_key)
     selling_names = sorted({area_name_map.get(code, code) for code in selling_unknown_codes}, key=order_key)
@@ -2684,7 +3493,7 @@ def parse_UTK0201_000(url: str, sess: requests.Session, referer: Optional[str] =
 
     sold_out = False
     if area_name_map:
-        any_hot = any(("熱賣" in s) or ("可售" in s) or ("可購" in s) for s in area_status_map.values())
+        any_hot = any(_RE_ONSALE.search(s) for s in area_status_map.values() if s)
         any_num = any(v > 0 for v in numeric_counts.values())
         if not any_hot and not any_num and area_status_map:
             sold_out = all(("已售完" in area_status_map.get(code, "")) for code in area_name_map.keys())
@@ -2695,20 +3504,21 @@ def parse_UTK0201_000(url: str, sess: requests.Session, referer: Optional[str] =
     out["total"] = total_num
     out["soldout"] = bool(sold_out)
 
-    ticket_map: Dict[tuple, Dict[str, Any]] = {}
+    # (area, price) -> 票種；area 為空字串代表剛建立的新項目
+    ticket_map: Dict[tuple, Dict[str, Any]] = defaultdict(
+        lambda: {"area": "", "price": 0, "remaining": 0, "_order": 99999}
+    )
     for code, area_name in area_name_map.items():
         area = area_name or code
+        # area_price_map 幾乎都是 int，先走這條，不必再解析一次
         price_val = area_price_map.get(code)
-        if price_val is None:
-            price_val = _parse_price_value(area_status_map.get(code))
-        price_int: Optional[int]
         if isinstance(price_val, int):
             price_int = price_val
+        elif price_val is None:
+            price_int = _parse_price_value(area_status_map.get(code)) or 0
         elif isinstance(price_val, str):
-            price_int = _parse_price_value(price_val)
+            price_int = _parse_price_value(price_val) or 0
         else:
-            price_int = price_val if isinstance(price_val, int) else None
-        if price_int is None:
             price_int = 0
         remaining_val = numeric_counts.get(code)
         if remaining_val is None:
@@ -2717,44 +3527,43 @@ def parse_UTK0201_000(url: str, sess: requests.Session, referer: Optional[str] =
                 remaining_val = 0
             else:
                 remaining_val = 0
-        key = (area, int(price_int))
+        price_int = int(price_int)
         rem_int = int(max(0, remaining_val or 0))
-        entry = ticket_map.get(key)
         order_val = area_order_map.get(code, 99999)
-        if entry:
-            entry["remaining"] = max(entry["remaining"], rem_int)
-            entry["_order"] = min(entry["_order"], order_val)
-        else:
-            ticket_map[key] = {
-                "area": area,
-                "price": int(price_int),
-                "remaining": rem_int,
-                "_order": order_val,
-            }
+        entry = ticket_map[(area, price_int)]
+        if not entry["area"]:
+            entry["area"] = area
+            entry["price"] = price_int
+            entry["_order"] = order_val
+        elif order_val < entry["_order"]:
+            entry["_order"] = order_val
+        if rem_int > entry["remaining"]:
+            entry["remaining"] = rem_int
 
     for code, count in numeric_counts.items():
         if code in area_name_map:
             continue
-        area = code
-        key = (area, 0)
         rem_int = int(max(0, count or 0))
-        entry = ticket_map.get(key)
-        if entry:
-            entry["remaining"] = max(entry["remaining"], rem_int)
-        else:
-            ticket_map[key] = {"area": area, "price": 0, "remaining": rem_int, "_order": area_order_map.get(code, 99999)}
-
-    tickets = sorted(ticket_map.values(), key=lambda t: (t.get("_order", 99999), t["area"], t.get("price", 0)))
-    for t in tickets:
-        t.pop("_order", None)
+        entry = ticket_map[(code, 0)]
+        if not entry["area"]:
+            entry["area"] = code
+            entry["_order"] = area_order_map.get(code, 99999)
+        if rem_int > entry["remaining"]:
+            entry["remaining"] = rem_int
+
+    # 排序用的 _order 不輸出：排完直接投影掉，不逐筆 pop
+    tickets = [
+        {k: v for k, v in t.items() if k != "_order"}
+        for t in sorted(ticket_map.values(), key=lambda t: (t["_order"], t["area"], t["price"]))
+    ]
 
-    table_tickets = _extract_utk_ticket_rows(html)
+    table_tickets = _extract_utk_ticket_rows(html, soup)
     if table_tickets:
         out["tickets"] = table_tickets
     else:
         out["tickets"] = tickets
 
-    remaining_summary = _summarize_remaining_tickets(out.get("tickets"), html, url)
+    remaining_summary = _summarize_remaining_tickets(out.get("tickets"), html, url, soup)
     if remaining_summary:
         out["remaining_tickets"] = remaining_summary
         try:
@@ -2766,8 +3575,7 @@ def parse_UTK0201_000(url: str, sess: requests.Session, referer: Optional[str] =
             out.setdefault("remaining", remaining_val)
 
 
-    sig_base = hash_state(human_numeric, selling_names)
-    out["sig"] = hashlib.md5((sig_base + ("|SO" if sold_out else "")).encode("utf-8")).hexdigest()
+    out["sig"] = hash_state(human_numeric, selling_names, sold_out)
 
     out["ok"] = (total_num > 0) or bool(selling_names)
 
@@ -2849,21 +3657,16 @@ def _probe_activity_details(url: str, sess: requests.Session, trace: Optional[Li
     details_url_clean = details_dict.get("details_url") or sanitize_details_url(url)
     pattern = details_dict.get("pattern")
     if not pattern:
-        qs = parse_qs(urlparse(details_url_clean).query)
-        pattern = (qs.get("pattern", ["ENTERTAINMENT"])[0] or "ENTERTAINMENT").strip()
+        pattern = (_url_query_fields(details_url_clean)[2] or "ENTERTAINMENT").strip()
 
     activity_id = details_dict.get("activity_id") or _activity_id_from_url(details_url_clean) or _activity_id_from_url(url)
 
-    ticket_candidates: List[str] = []
-    for source in (
-        details_dict.get("ticket_urls"),
-        api_dict.get("ticket_urls"),
-    ):
-        if not source:
-            continue
-        for t in source:
-            if t not in ticket_candidates:
-                ticket_candidates.append(t)
+    ticket_candidates: List[str] = list(dict.fromkeys(
+        t
+        for source in (details_dict.get("ticket_urls"), api_dict.get("ticket_urls"))
+        if source
+        for t in source
+    ))
 
     resolved_ticket = _resolve_utk_url(activity_id, pattern, sess, details_url_clean, trace=trace)
     if resolved_ticket and resolved_ticket not in ticket_candidates:
@@ -2920,11 +3723,14 @@ def _probe_activity_details(url: str, sess: requests.Session, trace: Optional[Li
                         })
                     continue
 
+                img_final = base_img or parsed.get("image", LOGO)
                 parsed.setdefault("details_url", details_url_clean)
-                parsed["ticket_url"] = ticket_url
-                parsed["url"] = details_url_clean
-                parsed["image"] = base_img or parsed.get("image", LOGO)
-                parsed["image_url"] = parsed.get("image")
+                parsed.update(
+                    ticket_url=ticket_url,
+                    url=details_url_clean,
+                    image=img_final,
+                    image_url=img_final,
+                )
 
                 if base_title and not base_title.startswith("（未取到"):
                     parsed["title"] = base_title
@@ -2932,16 +3738,14 @@ def _probe_activity_details(url: str, sess: requests.Session, trace: Optional[Li
                     parsed["title"] = parsed.get("title") or base_title
 
                 if base_place:
-                    parsed["place"] = base_place
-                    parsed["venue"] = base_place
+                    parsed.update(place=base_place, venue=base_place)
                 else:
-                    parsed["place"] = parsed.get("place", "")
-                    parsed["venue"] = parsed.get("venue", parsed.get("place", ""))
+                    parsed.setdefault("venue", parsed.setdefault("place", ""))
 
                 if base_dt:
                     parsed["date"] = base_dt
                 else:
-                    parsed["date"] = parsed.get("date", "")
+                    parsed.setdefault("date", "")
 
                 if activity_id:
                     parsed.setdefault("activity_id", activity_id)
@@ -2962,14 +3766,7 @@ def _probe_activity_details(url: str, sess: requests.Session, trace: Optional[Li
                     })
 
                 if parsed.get("tickets"):
-                    try:
-                        total_remaining = sum(
-                            max(0, int(t.get("remaining", 0)))
-                            for t in parsed.get("tickets", [])
-                            if isinstance(t, dict)
-                        )
-                    except Exception:
-                        total_remaining = 0
+                    total_remaining = _sum_ticket_remaining(parsed["tickets"])
                     if total_remaining:
                         parsed["remain"] = total_remaining
                         parsed["remaining"] = total_remaining
@@ -2989,23 +3786,63 @@ def _probe_activity_details(url: str, sess: requests.Session, trace: Optional[Li
             if fallback_remaining is not None:
                 result_base.setdefault("remain", fallback_remaining)
                 result_base.setdefault("remaining", fallback_remaining)
-    try:
-        total_remaining = sum(
-            max(0, int(t.get("remaining", 0)))
-            for t in result_base.get("tickets", [])
-            if isinstance(t, dict)
-        )
-    except Exception:
-        total_remaining = 0
+    total_remaining = _sum_ticket_remaining(result_base.get("tickets"))
     if total_remaining:
         result_base["remain"] = total_remaining
         result_base["remaining"] = total_remaining
     return result_base
 
 
-def probe(url: str) -> dict:
+# probe 結果短期快取：多人監看同一場、或連續 /check 時，TTL 內只打一次 ibon。
+# 同一網址同時有多個呼叫時只有第一個真的去抓，其餘等它的結果（single-flight）。
+_PROBE_TTL = float(os.getenv("PROBE_TTL_SEC", "30"))
+_PROBE_CACHE: Dict[str, Tuple[float, dict]] = {}
+_PROBE_CACHE_MAX = 512
+_PROBE_INFLIGHT: Dict[str, Future] = {}
+_PROBE_LOCK = threading.Lock()
+
+
+def probe(url: str, fresh: bool = False) -> dict:
+    """fresh=True 時略過快取（除錯用）；回傳值一律是副本，呼叫端可自由修改。"""
+    if fresh or _PROBE_TTL <= 0:
+        return _probe_uncached(url)
+    try:
+        key = canonicalize_url(url)
+    except Exception:
+        key = url
+
+    with _PROBE_LOCK:
+        hit = _PROBE_CACHE.get(key)
+        if hit and time.time() - hit[0] < _PROBE_TTL:
+            return copy.deepcopy(hit[1])
+        fut = _PROBE_INFLIGHT.get(key)
+        owner = fut is None
+        if owner:
+            fut = Future()
+            _PROBE_INFLIGHT[key] = fut
+    if not owner:
+        return copy.deepcopy(fut.result())
+
+    try:
+        res = _probe_uncached(url)
+    except BaseException as exc:
+        with _PROBE_LOCK:
+            _PROBE_INFLIGHT.pop(key, None)
+        fut.set_exception(exc)
+        raise
+    with _PROBE_LOCK:
+        _PROBE_INFLIGHT.pop(key, None)
+        _PROBE_CACHE.pop(key, None)
+        _PROBE_CACHE[key] = (time.time(), copy.deepcopy(res))
+        while len(_PROBE_CACHE) > _PROBE_CACHE_MAX:
+            _PROBE_CACHE.pop(next(iter(_PROBE_CACHE)))
+    fut.set_result(res)
+    return copy.deepcopy(res)
+
+
+def _probe_uncached(url: str) -> dict:
     s = sess_default()
-    p = urlparse(url)
+    p = _cached_urlparse(url)
     if "orders.ibon.com.tw" in p.netloc and p.path.upper().endswith("/UTK0201_000.ASPX"):
         return parse_UTK0201_000(url, s)
     if "ticket.ibon.com.tw" in p.netloc and "/ActivityInfo/Details" in p.path:
@@ -3019,7 +3856,7 @@ def probe(url: str) -> dict:
     title = ""
     try:
         html_blob = read_html_safely(r)
-        soup = soup_parse(html_blob)
+        soup = soup_parse(html_blob, parse_only=_TITLE_ONLY)
         if soup.title and soup.title.text:
             title = soup.title.text.strip()
     except Exception:
@@ -3060,23 +3897,48 @@ def source_id(ev):
 def make_task_id() -> str:
     return uuid.uuid4().hex[:6]
 
+def _task_doc_id(chat_id: str, tid: str) -> str:
+    """新任務的文件 ID（chat_id:tid），讓依任務代碼查詢變成單筆讀取；'/' 在文件 ID 中不合法。"""
+    return f"{chat_id}:{tid}".replace("/", "_")
+
 def fs_get_task_by_canon(chat_id: str, url_canon: str):
     if not FS_OK: return None
     q = (fs_client.collection(COL)
          .where("chat_id", "==", chat_id)
          .where("url_canon", "==", url_canon)
          .limit(1).stream())
-    for d in q: return d
-    return None
+    return next(iter(q), None)
+
+_FS_IN_MAX = 30  # Firestore 'in' 查詢一次最多 30 個值
+
+def fs_get_tasks_by_canons(chat_id: str, canons: List[str]) -> Dict[str, Any]:
+    """一次查多個 url_canon（每 _FS_IN_MAX 個一批），回傳 {url_canon: doc}；同一網址有多筆時取第一筆。"""
+    if not FS_OK: return {}
+    uniq = list(dict.fromkeys(canons))
+    found: Dict[str, Any] = {}
+    col = fs_client.collection(COL)
+    for i in range(0, len(uniq), _FS_IN_MAX):
+        q = (col.where(filter=firestore.FieldFilter("chat_id", "==", chat_id))
+             .where(filter=firestore.FieldFilter("url_canon", "in", uniq[i:i + _FS_IN_MAX]))
+             .stream())
+        for d in q:
+            found.setdefault((d.to_dict() or {}).get("url_canon"), d)
+    return found
 
 def fs_get_task_by_id(chat_id: str, tid: str):
     if not FS_OK: return None
+    try:
+        snap = fs_client.collection(COL).document(_task_doc_id(chat_id, tid)).get()
+        if snap.exists and (snap.to_dict() or {}).get("chat_id") == chat_id:
+            return snap
+    except Exception as e:
+        _get_logger().info(f"[fs] point read failed, fallback to query: {e}")
+    # 舊任務是 add() 建的自動 ID，只能用查詢找
     q = (fs_client.collection(COL)
          .where("chat_id", "==", chat_id)
          .where("id", "==", tid)
          .limit(1).stream())
-    for d in q: return d
-    return None
+    return next(iter(q), None)
 
 def fs_upsert_watch(chat_id: str, url: str, sec: int):
     if not FS_OK:
@@ -3091,7 +3953,7 @@ def fs_upsert_watch(chat_id: str, url: str, sec: int):
         })
         return doc.to_dict()["id"], False
     tid = make_task_id()
-    fs_client.collection(COL).add({
+    fs_client.collection(COL).document(_task_doc_id(chat_id, tid)).set({
         "id": tid, "chat_id": chat_id, "url": url, "url_canon": url_c,
         "period": sec, "enabled": True, "created_at": now, "updated_at": now,
         "last_sig": "", "last_total": 0, "last_ok": False, "next_run_at": now,
@@ -3136,6 +3998,11 @@ def fs_disable(chat_id: str, tid: str) -> bool:
     })
     return True
 
+def _sec_sort_key(kv: Tuple[str, int]) -> Tuple[int, str]:
+    """無 sections_order 時的排序：張數多者在前，同數量依名稱。"""
+    return (-kv[1], kv[0])
+
+
 def fmt_result_text(res: dict) -> str:
     lines = []
     if res.get("task_id"):
@@ -3157,17 +4024,13 @@ def fmt_result_text(res: dict) -> str:
         if secs:
             lines.append("\n✅ 監看結果：目前可售")
             if order:
-                for name in order:
-                    if name in secs:
-                        lines.append(f"{name}: {secs[name]} 張")
+                lines.extend(f"{name}: {secs[name]} 張" for name in order if name in secs)
             else:
-                for k, v in sorted(secs.items(), key=lambda x: (-x[1], x[0])):
-                    lines.append(f"{k}: {v} 張")
+                lines.extend(f"{k}: {v} 張" for k, v in sorted(secs.items(), key=_sec_sort_key))
             lines.append(f"合計：{res.get('total',0)} 張")
         if selling:
             lines.append("\n🟢 目前熱賣中（數量未公開）：")
-            for n in selling:
-                lines.append(f"・{n}（熱賣中）")
+            lines.extend(f"・{n}（熱賣中）" for n in selling)
     else:
         lines.append("\n暫時讀不到剩餘數（可能為動態載入）。")
     lines.append(res.get("url", ""))
@@ -3204,8 +4067,11 @@ def handle_command(text: str, chat_id: str):
                     out = "（沒有任務）"
                     return [TextSendMessage(text=out)] if HAS_LINE else [out]
 
+                # 以 list + 累計長度組訊息，避免 buf += line 反覆複製字串
                 chunks = []
-                buf = "你的任務：\n"
+                header = "你的任務：\n"
+                buf_parts = [header]
+                size = len(header)
                 for r in rows:
                     try:
                         rid    = str(r.get("id", "?"))
@@ -3217,12 +4083,13 @@ def handle_command(text: str, chat_id: str):
                         _get_logger().info(f"[list] format row fail: {e}; row={r}")
                         line = f"{r}\n\n"
 
-                    if len(buf) + len(line) > 4800:
-                        chunks.append(buf.rstrip())
-                        buf = ""
-                    buf += line
-                if buf:
-                    chunks.append(buf.rstrip())
+                    if size + len(line) > 4800:
+                        chunks.append("".join(buf_parts).rstrip())
+                        buf_parts, size = [], 0
+                    buf_parts.append(line)
+                    size += len(line)
+                if buf_parts:
+                    chunks.append("".join(buf_parts).rstrip())
 
                 if HAS_LINE:
                     to_reply = chunks[:5]
@@ -3276,8 +4143,8 @@ def handle_command(text: str, chat_id: str):
 
         if cmd == "/probe" and len(parts) >= 2:
             url = parts[1].strip()
-            res = probe(url)
-            out = json.dumps(res, ensure_ascii=False)
+            res = probe(url, fresh=True)
+            out = _json_dumps(res)
             return [TextSendMessage(text=out)] if HAS_LINE else [out]
 
         return [TextSendMessage(text=HELP)] if HAS_LINE else [HELP]
@@ -3325,7 +4192,7 @@ def cron_tick():
         response["ok"] = False
         response["queued"] = False
 
-    return jsonify(response), 200
+    return _json_response(response)
 
 
 @main_bp.route("/diag", methods=["GET"])
@@ -3334,8 +4201,8 @@ def diag():
     if not url:
         return jsonify({"ok": False, "msg": "missing url"}), 400
     try:
-        res = probe(url)
-        return jsonify(res), 200
+        res = probe(url, fresh=True)
+        return _json_response(res)
     except Exception as e:
         return jsonify({"ok": False, "msg": str(e)}), 500
 
@@ -3363,10 +4230,21 @@ def http_check_once():
     if not url:
         return jsonify({"ok": False, "msg": "provide ?url=<UTK0201_000 url>"}), 400
     res = probe(url)
-    return jsonify(res), 200
+    return _json_response(res)
 
 # ====== Entertainment helpers & LIFF API ======
 
+# HTML 兜底：卡片與卡片內的 Details 連結／標題 selector（逐卡片呼叫，先編譯好）
+_SEL_DETAILS_ANCHOR = soupsieve.compile('a[href*="ActivityInfo/Details"]')
+_SEL_CARD_NODES = soupsieve.compile('.owl-item, .item, .swiper-slide, .card, .banner, .list, a[href*="ActivityInfo/Details"]')
+_SEL_CARD_TITLES = tuple(soupsieve.compile(sel) for sel in ("strong", "h3", ".title", ".txt", "span"))
+# HTML 兜底：Details 連結附近找標題，依序 title 屬性、strong/h3、img alt
+_HTML_HARD_TITLE_PATTERNS = (
+    re.compile(r'title\s*=\s*"([^"]{2,})"'),
+    re.compile(r'(?is)<(?:strong|h3)[^>]*>\s*([^<]{2,})\s*</(?:strong|h3)>'),
+    re.compile(r'(?is)<img[^>]*\balt\s*=\s*"([^"]{2,})"'),
+)
+
 def fetch_ibon_ent_html_hard(limit=10, keyword=None, only_concert=False):
     """
     超寬鬆 HTML 兜底版本：
@@ -3376,13 +4254,7 @@ def fetch_ibon_ent_html_hard(limit=10, keyword=None, only_concert=False):
     - 永遠回傳 list
     """
     url = IBON_ENT_URL
-    s = requests.Session()
-    s.headers.update({
-        "User-Agent": UA,
-        "Accept-Language": "zh-TW,zh;q=0.9,en;q=0.6",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Connection": "close",
-    })
+    s = sess_default()
     items: List[Dict[str, Any]] = []
     seen: Set[str] = set()
 
@@ -3393,7 +4265,7 @@ def fetch_ibon_ent_html_hard(limit=10, keyword=None, only_concert=False):
         soup = soup_parse(html)
 
         # 先把所有 Details 連結撿出來
-        all_details = _extract_details_any(html)
+        all_details = _extract_details_any(html, soup)
 
         def _pick_title_from_node(node) -> Optional[str]:
             # 1) node 本身的 title 屬性
@@ -3408,9 +4280,9 @@ def fetch_ibon_ent_html_hard(limit=10, keyword=None, only_concert=False):
             if img and (img.get("alt") or "").strip():
                 return img.get("alt").strip()
             # 3) 近鄰的 strong/h3/span 文字
-            for sel in ("strong", "h3", ".title", ".txt", "span"):
+            for sel in _SEL_CARD_TITLES:
                 try:
-                    cand = node.select_one(sel) if hasattr(node, "select_one") else None
+                    cand = sel.select_one(node) if hasattr(node, "select_one") else None
                     if cand:
                         txt = cand.get_text(" ", strip=True)
                         if txt and len(txt) >= 2:
@@ -3428,7 +4300,7 @@ def fetch_ibon_ent_html_hard(limit=10, keyword=None, only_concert=False):
 
         # 先嘗試用 DOM 找「卡片」
         try:
-            card_nodes = soup.select('.owl-item, .item, .swiper-slide, .card, .banner, .list, a[href*="ActivityInfo/Details"]')
+            card_nodes = _SEL_CARD_NODES.select(soup)
         except Exception:
             card_nodes = []
 
@@ -3436,7 +4308,7 @@ def fetch_ibon_ent_html_hard(limit=10, keyword=None, only_concert=False):
             try:
                 # 試從卡片內找 Details
                 href = None
-                atag = nd.select_one('a[href*="ActivityInfo/Details"]')
+                atag = _SEL_DETAILS_ANCHOR.select_one(nd)
                 if atag and atag.get("href"):
                     href = urljoin(IBON_BASE, atag["href"].strip())
                 # 沒有就跳過
@@ -3483,22 +4355,18 @@ def fetch_ibon_ent_html_hard(limit=10, keyword=None, only_concert=False):
             title = None
             try:
                 # 取出 href 周邊 300 字元尋找候選文字
-                m = re.search(re.escape(href), html)
-                if m:
-                    start = max(0, m.start() - 300)
-                    end   = min(len(html), m.end() + 300)
+                # href 是字面字串：str.find 直接在 C 裡比對，不必每筆 re.escape + 編譯
+                pos = html.find(href)
+                if pos >= 0:
+                    start = max(0, pos - 300)
+                    end   = min(len(html), pos + len(href) + 300)
                     blob  = html[start:end]
-                    # title 屬性
-                    mt = re.search(r'title\s*=\s*"([^"]{2,})"', blob)
-                    if mt: title = mt.group(1).strip()
-                    # strong/h3
-                    if not title:
-                        mt = re.search(r'(?is)<(?:strong|h3)[^>]*>\s*([^<]{2,})\s*</(?:strong|h3)>', blob)
-                        if mt: title = mt.group(1).strip()
-                    # img alt
-                    if not title:
-                        mt = re.search(r'(?is)<img[^>]*\balt\s*=\s*"([^"]{2,})"', blob)
-                        if mt: title = mt.group(1).strip()
+                    for pat in _HTML_HARD_TITLE_PATTERNS:
+                        mt = pat.search(blob)
+                        if mt:
+                            title = mt.group(1).strip()
+                            if title:
+                                break
             except Exception:
                 pass
 
@@ -3537,7 +4405,36 @@ def _truthy(v: Optional[str]) -> bool:
 # 簡單保險絲（30 分鐘）
 _API_BREAK_UNTIL = 0
 
+# 輪播結果短期快取：LIFF 列表短時間內被連續打開時不必每次都回 ibon。
+# 過期的項目先留著：上游出錯或保險絲打開（回空）時改回最後一次成功的列表。
+_CAROUSEL_TTL = float(os.getenv("CAROUSEL_TTL_SEC", "20"))
+_CAROUSEL_CACHE: Dict[Tuple[int, str, bool], Tuple[float, List[Dict[str, Any]]]] = {}
+_CAROUSEL_CACHE_MAX = 64
+_CAROUSEL_CACHE_LOCK = threading.Lock()
+
+
 def fetch_ibon_carousel_from_api(limit=10, keyword=None, only_concert=False):
+    key = (max(1, int(limit)), (keyword or "").strip(), bool(only_concert))
+    with _CAROUSEL_CACHE_LOCK:
+        hit = _CAROUSEL_CACHE.get(key)
+    if hit and _CAROUSEL_TTL > 0 and time.time() - hit[0] < _CAROUSEL_TTL:
+        return [dict(it) for it in hit[1]]
+
+    items = _fetch_ibon_carousel_from_api_uncached(limit=limit, keyword=keyword, only_concert=only_concert)
+    if items:
+        with _CAROUSEL_CACHE_LOCK:
+            _CAROUSEL_CACHE.pop(key, None)
+            _CAROUSEL_CACHE[key] = (time.time(), [dict(it) for it in items])
+            while len(_CAROUSEL_CACHE) > _CAROUSEL_CACHE_MAX:
+                _CAROUSEL_CACHE.pop(next(iter(_CAROUSEL_CACHE)))
+        return items
+    if hit:
+        _get_logger().info(f"[carousel-api] upstream empty -> serve stale ({int(time.time() - hit[0])}s old)")
+        return [dict(it) for it in hit[1]]
+    return items
+
+
+def _fetch_ibon_carousel_from_api_uncached(limit=10, keyword=None, only_concert=False):
     global _API_BREAK_UNTIL
     now = time.time()
     if now < _API_BREAK_UNTIL:
@@ -3552,6 +4449,7 @@ def fetch_ibon_carousel_from_api(limit=10, keyword=None, only_concert=False):
         "Origin": "https://ticket.ibon.com.tw",
         "Referer": IBON_ENT_URL,
         "X-Requested-With": "XMLHttpRequest",
+        "Accept": "application/json, text/plain, */*",
     }
     if token:
         headers["X-XSRF-TOKEN"] = token
@@ -3581,7 +4479,7 @@ def fetch_ibon_carousel_from_api(limit=10, keyword=None, only_concert=False):
         if not url:
             return False
 
-        canon = canonicalize_url(url)
+        canon = item.get("details_url") or canonicalize_url(url)
         if canon in seen_urls:
             return False
 
@@ -3598,7 +4496,7 @@ def fetch_ibon_carousel_from_api(limit=10, keyword=None, only_concert=False):
             return [it for it in val if isinstance(it, (dict, str, int))]
         if isinstance(val, str) and val.strip():
             try:
-                parsed = json.loads(val)
+                parsed = _json_loads(val)
                 if isinstance(parsed, list):
                     return [it for it in parsed if isinstance(it, (dict, str, int))]
             except Exception:
@@ -3623,7 +4521,7 @@ def fetch_ibon_carousel_from_api(limit=10, keyword=None, only_concert=False):
 
         if resp.status_code == 200:
             try:
-                payload = resp.json()
+                payload = _resp_json(resp)
             except Exception:
                 payload = {}
 
@@ -3691,18 +4589,20 @@ def fetch_ibon_carousel_from_api(limit=10, keyword=None, only_concert=False):
                 "Origin": "https://ticket.ibon.com.tw",
                 "Referer": IBON_ENT_URL,
                 "X-Requested-With": "XMLHttpRequest",
+                "Accept": "application/json, text/plain, */*",
             }
             if token:
                 headers["X-XSRF-TOKEN"] = token
             continue
         elif resp.status_code in (401, 403, 419):
-            session, token = _prepare_ibon_session()
+            session, token = _prepare_ibon_session(refresh=True)
             if session is None:
                 break
             headers = {
                 "Origin": "https://ticket.ibon.com.tw",
                 "Referer": IBON_ENT_URL,
                 "X-Requested-With": "XMLHttpRequest",
+                "Accept": "application/json, text/plain, */*",
             }
             if token:
                 headers["X-XSRF-TOKEN"] = token
@@ -3716,6 +4616,19 @@ def fetch_ibon_carousel_from_api(limit=10, keyword=None, only_concert=False):
 
     return items[:max_items] if items else []
 
+# _extract_carousel_html_hard 用的正則（模組載入時編譯一次）
+_RE_CAROUSEL_BLOCK_SPLIT = re.compile(r'<div[^>]+class="[^"]*(?:item|owl-item)[^"]*"', re.I)
+_RE_CAROUSEL_IMG = re.compile(r'<img[^>]+(?:src|data-src|data-original)\s*=\s*["\']([^"\']+)["\'][^>]*>', re.I | re.S)
+# 依序：a[title] → img[alt] → h3 → strong
+_CAROUSEL_TITLE_PATTERNS = tuple(re.compile(p, re.I | re.S) for p in (
+    r'<a[^>]+title\s*=\s*["\']([^"\']+)["\']',
+    r'<img[^>]+alt\s*=\s*["\']([^"\']+)["\']',
+    r'<h3[^>]*>\s*([^<]{2,})\s*</h3>',
+    r'<strong[^>]*>\s*([^<]{2,})\s*</strong>',
+))
+_RE_CAROUSEL_A_HREF = re.compile(r'<a[^>]+href\s*=\s*["\']([^"\']+)["\']', re.I | re.S)
+
+
 def _extract_carousel_html_hard(html: str, limit=10, keyword=None, only_concert=False):
     """
     只靠正則把 <img ... alt=... src=...> 與 Details/<id> 抓出來，
@@ -3727,42 +4640,39 @@ def _extract_carousel_html_hard(html: str, limit=10, keyword=None, only_concert=
 
     # 1) 先抓所有卡片區塊（盡量縮小範圍，但就算抓到整頁也沒關係）
     #    這裡以 <div class="item">... 或 <div class="owl-item">... 為線索，但不強制
-    blocks = re.split(r'(?i)<div[^>]+class="[^"]*(?:item|owl-item)[^"]*"', html)
+    blocks = _RE_CAROUSEL_BLOCK_SPLIT.split(html)
     if len(blocks) <= 1:
         blocks = [html]  # 退路：整頁掃
 
     def _pick_img(block):
         # 支援 src / data-src / data-original
-        m = re.search(r'(?is)<img[^>]+(?:src|data-src|data-original)\s*=\s*["\']([^"\']+)["\'][^>]*>', block)
+        m = _RE_CAROUSEL_IMG.search(block)
         return m.group(1).strip() if m else None
 
     def _pick_title(block):
         # 先 a[title] → 再 img[alt] → 再 h3/strong 文字
-        m = re.search(r'(?is)<a[^>]+title\s*=\s*["\']([^"\']+)["\']', block)
-        if m and m.group(1).strip():
-            return m.group(1).strip()
-        m = re.search(r'(?is)<img[^>]+alt\s*=\s*["\']([^"\']+)["\']', block)
-        if m and m.group(1).strip():
-            return m.group(1).strip()
-        m = re.search(r'(?is)<h3[^>]*>\s*([^<]{2,})\s*</h3>', block)
-        if m and m.group(1).strip():
-            return m.group(1).strip()
-        m = re.search(r'(?is)<strong[^>]*>\s*([^<]{2,})\s*</strong>', block)
-        if m and m.group(1).strip():
-            return m.group(1).strip()
+        for pat in _CAROUSEL_TITLE_PATTERNS:
+            m = pat.search(block)
+            if m:
+                t = m.group(1).strip()
+                if t:
+                    return t
         return None
 
     def _pick_url(block, title):
         # 優先抓 Details 連結；沒有就用搜尋連結保底
-        m = re.search(r'(?i)(?:https?://ticket\.ibon\.com\.tw)?/ActivityInfo/Details/(\d+)', block)
-        if m:
-            return urljoin(IBON_BASE, m.group(0))
-        # 也掃一下 a[href]
-        m = re.search(r'(?is)<a[^>]+href\s*=\s*["\']([^"\']+)["\']', block)
-        if m:
-            href = urljoin(IBON_BASE, m.group(1))
-            if "/ActivityInfo/Details/" in href:
-                return href
+        # 先用字串搜尋確認有字面值，沒有的區塊不必跑正則
+        if "/activityinfo/details/" in block.lower():
+            m = _RE_DETAILS_LINK.search(block)
+            if m:
+                return urljoin(IBON_BASE, m.group(0))
+        # 也掃一下 a[href]（結果要含 Details/ 才採用，區塊裡沒有就不用掃）
+        if "Details/" in block:
+            m = _RE_CAROUSEL_A_HREF.search(block)
+            if m:
+                href = urljoin(IBON_BASE, m.group(1))
+                if "/ActivityInfo/Details/" in href:
+                    return href
         # 最後保底：用搜尋
         return f"https://ticket.ibon.com.tw/SearchResult?keyword={title}"
 
@@ -3918,9 +4828,112 @@ def _background_unwatch_job(app_obj: Flask, chat_id: Optional[str], url: Optiona
         _push_detail_to_chat(chat_id, None, fallback=status_line)
 
 
+def _list_due_watchers(now: datetime) -> Iterable[Any]:
+    """到期的 watcher，最久沒跑的排前面；多抓一筆讓呼叫端知道超過 MAX_PER_TICK。
+
+    走 enabled + next_run_at 複合索引（firestore.indexes.json）在伺服器端過濾；
+    索引還沒建好時退回全部 enabled 的舊查法，由呼叫端逐筆判斷是否到期。
+    """
+    col = fs_client.collection(COL)
+    try:
+        return list(
+            col.where(filter=firestore.FieldFilter("enabled", "==", True))
+            .where(filter=firestore.FieldFilter("next_run_at", "<=", now))
+            .order_by("next_run_at")
+            .limit(MAX_PER_TICK + 1)
+            .stream()
+        )
+    except Exception as exc:
+        _get_logger().info(f"[tick] due query failed, fallback to full scan: {exc}")
+    # 全掃時直接回串流：呼叫端湊滿 MAX_PER_TICK 就停，不必把所有 watcher 先讀進記憶體
+    return col.where(filter=firestore.FieldFilter("enabled", "==", True)).stream()
+
+
+def _tick_probe(url: Optional[str]) -> Dict[str, Any]:
+    try:
+        return probe(url)
+    except Exception as exc:
+        _get_logger().error(f"[tick] probe error for {url}: {exc}")
+        return {"ok": False, "msg": f"probe error: {exc}", "sig": "NA", "url": url}
+
+
+_TICK_BATCH_MAX = 400  # Firestore 單一 batch 上限 500 筆寫入，留點餘裕
+
+
+class _TickWriter:
+    """把 watcher 狀態更新收進 WriteBatch 一次 commit（滿 _TICK_BATCH_MAX 先送）。
+
+    WriteBatch 是原子的：只要一筆失敗（例如文件在查詢後被刪掉）整批都不會寫入，
+    所以 commit 失敗時改逐筆 update，其餘 watcher 的 last_sig / next_run_at 照樣存下來。
+    """
+
+    def __init__(self, resp: Dict[str, Any]):
+        self._resp = resp
+        self._ops: List[Tuple[str, Dict[str, Any]]] = []
+
+    def update(self, doc_id: str, payload: Dict[str, Any]) -> None:
+        self._ops.append((doc_id, payload))
+        if len(self._ops) >= _TICK_BATCH_MAX:
+            self.commit()
+
+    def commit(self) -> None:
+        if not self._ops:
+            return
+        ops, self._ops = self._ops, []
+        col = fs_client.collection(COL)
+        try:
+            batch = fs_client.batch()
+            for doc_id, payload in ops:
+                batch.update(col.document(doc_id), payload)
+            batch.commit()
+            return
+        except Exception as exc:
+            _get_logger().info(f"[tick] batch update failed ({len(ops)} docs), retry one by one: {exc}")
+        for doc_id, payload in ops:
+            try:
+                col.document(doc_id).update(payload)
+            except Exception as exc:
+                _get_logger().error(f"[tick] update error for {doc_id}: {exc}")
+                self._resp["errors"].append(f"update error: {exc}")
+
+
+def _stage_tick_update(d: Any, r: Dict[str, Any], res: Dict[str, Any], now: datetime, writer: _TickWriter) -> None:
+    """排入 watcher 狀態更新（last_sig / next_run_at 等）。"""
+    period = int(r.get("period", DEFAULT_PERIOD_SEC))
+    writer.update(d.id, {
+        "last_sig": res.get("sig", "NA"),
+        "last_total": res.get("total", 0),
+        "last_ok": bool(res.get("ok", False)),
+        "updated_at": now,
+        "next_run_at": now + timedelta(seconds=period),
+    })
+
+
+def _notify_tick_result(r: Dict[str, Any], res: Dict[str, Any], resp: Dict[str, Any]) -> None:
+    """簽章有變（或 ALWAYS_NOTIFY）時推播。"""
+    changed = (res.get("sig", "NA") != r.get("last_sig", ""))
+    if ALWAYS_NOTIFY or changed:
+        try:
+            res["task_id"] = r.get("id")
+            chat_id = r.get("chat_id")
+            sent: Set[str] = set()
+            sm = res.get("seatmap")
+            img = res.get("image")
+            if sm and _url_ok(sm):
+                send_image(chat_id, sm)
+                sent.add(sm)
+            if img and _url_ok(img) and img not in sent:
+                send_image(chat_id, img)
+            send_text(chat_id, fmt_result_text(res))
+        except Exception as exc:
+            _get_logger().error(f"[tick] notify error: {exc}")
+            resp["errors"].append(f"notify error: {exc}")
+
+
 def _perform_cron_tick() -> Dict[str, Any]:
     start = time.time()
     resp: Dict[str, Any] = {"ok": True, "processed": 0, "skipped": 0, "errors": []}
+    writer = _TickWriter(resp)
     try:
         if not FS_OK:
             resp["ok"] = False
@@ -3929,74 +4942,69 @@ def _perform_cron_tick() -> Dict[str, Any]:
 
         now = datetime.now(timezone.utc)
         try:
-            docs = list(fs_client.collection(COL).where("enabled", "==", True).stream())
+            docs = _list_due_watchers(now)
         except Exception as exc:
             _get_logger().error(f"[tick] list watchers failed: {exc}")
             resp["ok"] = False
             resp["errors"].append(f"list failed: {exc}")
             return resp
 
-        handled = 0
+        due: List[Tuple[Any, Dict[str, Any]]] = []
         for d in docs:
-            if (time.time() - start) > TICK_SOFT_DEADLINE_SEC:
-                resp["errors"].append("soft-deadline reached; remaining will run next tick")
-                break
-            if handled >= MAX_PER_TICK:
+            if len(due) >= MAX_PER_TICK:
                 resp["errors"].append("max-per-tick reached; remaining will run next tick")
                 break
-
             r = d.to_dict()
-            period = int(r.get("period", DEFAULT_PERIOD_SEC))
             next_run_at = r.get("next_run_at") or (now - timedelta(seconds=1))
             if now < next_run_at:
                 resp["skipped"] += 1
                 continue
+            due.append((d, r))
 
-            url = r.get("url")
-            try:
-                res = probe(url)
-            except Exception as exc:
-                _get_logger().error(f"[tick] probe error for {url}: {exc}")
-                res = {"ok": False, "msg": f"probe error: {exc}", "sig": "NA", "url": url}
-
+        # 多人盯同一場：依 canonical URL 分組，每組只 probe 一次再分送給所有訂閱者
+        groups: Dict[str, List[Tuple[Any, Dict[str, Any]]]] = defaultdict(list)
+        for d, r in due:
+            url = r.get("url") or ""
             try:
-                fs_client.collection(COL).document(d.id).update({
-                    "last_sig": res.get("sig", "NA"),
-                    "last_total": res.get("total", 0),
-                    "last_ok": bool(res.get("ok", False)),
-                    "updated_at": now,
-                    "next_run_at": now + timedelta(seconds=period),
-                })
-            except Exception as exc:
-                _get_logger().error(f"[tick] update doc error: {exc}")
-                resp["errors"].append(f"update error: {exc}")
-
-            changed = (res.get("sig", "NA") != r.get("last_sig", ""))
-            if ALWAYS_NOTIFY or changed:
-                try:
-                    res["task_id"] = r.get("id")
-                    chat_id = r.get("chat_id")
-                    sent: Set[str] = set()
-                    sm = res.get("seatmap")
-                    img = res.get("image")
-                    if sm and _url_ok(sm):
-                        send_image(chat_id, sm)
-                        sent.add(sm)
-                    if img and _url_ok(img) and img not in sent:
-                        send_image(chat_id, img)
-                    send_text(chat_id, fmt_result_text(res))
-                except Exception as exc:
-                    _get_logger().error(f"[tick] notify error: {exc}")
-                    resp["errors"].append(f"notify error: {exc}")
-
-            handled += 1
-            resp["processed"] += 1
+                key = canonicalize_url(url)
+            except Exception:
+                key = url
+            groups[key].append((d, r))
+
+        if groups:
+            # 各 URL 的 probe 互不相依（網路 I/O 為主），丟進執行緒池並行；
+            # Firestore 更新與通知仍在這個執行緒依完成順序處理，計數不需上鎖
+            with ThreadPoolExecutor(max_workers=min(TICK_WORKERS, len(groups)), thread_name_prefix="tick") as pool:
+                futures = {pool.submit(_tick_probe, subs[0][1].get("url")): subs for subs in groups.values()}
+                deadline_hit = False
+                for fut in as_completed(futures):
+                    if fut.cancelled():
+                        continue
+                    res = fut.result()
+                    # 通知時會寫入各自的 task_id，每個訂閱者拿一份淺拷貝
+                    subs = [(d, r, dict(res)) for d, r in futures[fut]]
+                    for d, r, sub_res in subs:
+                        _stage_tick_update(d, r, sub_res, now, writer)
+                    # 先把新的 last_sig 存下來再推播：推播後才當掉也不會下一輪重複通知
+                    writer.commit()
+                    for d, r, sub_res in subs:
+                        _notify_tick_result(r, sub_res, resp)
+                        resp["processed"] += 1
+                    if not deadline_hit and (time.time() - start) > TICK_SOFT_DEADLINE_SEC:
+                        deadline_hit = True
+                        # 還沒開始跑的留到下一輪（沒更新 next_run_at，下輪仍會到期）
+                        if sum(1 for f in futures if f.cancel()):
+                            resp["errors"].append("soft-deadline reached; remaining will run next tick")
 
     except Exception as exc:
         _get_logger().error(f"[tick] fatal: {exc}\n{traceback.format_exc()}")
         resp["ok"] = False
         resp["errors"].append(str(exc))
     finally:
+        writer.commit()
+        # Cloud Run 回應後會降 CPU：回應前先把這一輪的通知送完
+        if not _flush_line_pushes(timeout=10):
+            resp["errors"].append("line push queue not drained")
         resp["elapsed_ms"] = int((time.time() - start) * 1000)
 
     return resp
@@ -4020,6 +5028,28 @@ def _background_cron_tick_job(app_obj: Flask, task_id: str) -> None:
 
 
 
+_LIFF_ENRICH_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="liff-enrich")
+
+
+def _enrich_liff_item(base: Dict[str, Any], sess: requests.Session, debug: bool) -> Optional[Dict[str, Any]]:
+    details_url = base.get("details_url") or base.get("url")
+    if not isinstance(details_url, str) or not details_url:
+        return None
+    item_trace: Optional[List[Dict[str, Any]]] = [] if debug else None
+    try:
+        data = _probe_activity_details(details_url, sess, trace=item_trace)
+    except Exception as exc:
+        _get_logger().info(f"[liff_api] enrich fail {details_url}: {exc}")
+        return None
+    base_image = base.get("image_url") or base.get("image")
+    if base_image and not data.get("image"):
+        data["image"] = base_image
+        data["image_url"] = base_image
+    if item_trace:
+        data["trace"] = item_trace
+    return data
+
+
 def _collect_liff_items(limit: int, keyword: Optional[str], only_concert: bool, mode: str, debug: bool) -> tuple[List[Dict[str, Any]], str, List[Dict[str, Any]]]:
     trace: List[Dict[str, Any]] = []
     items: List[Dict[str, Any]] = []
@@ -4061,26 +5091,11 @@ def _collect_liff_items(limit: int, keyword: Optional[str], only_concert: bool,
 
     if items:
         sess = sess_default()
-        enriched: List[Dict[str, Any]] = []
-        for base in items:
-            details_url = base.get("details_url") or base.get("url")
-            if not isinstance(details_url, str) or not details_url:
-                continue
-            item_trace: Optional[List[Dict[str, Any]]] = [] if debug else None
-            try:
-                data = _probe_activity_details(details_url, sess, trace=item_trace)
-            except Exception as exc:
-                _get_logger().info(f"[liff_api] enrich fail {details_url}: {exc}")
-                if item_trace is not None:
-                    item_trace.append({"phase": "error", "reason": str(exc)})
-                continue
-            base_image = base.get("image_url") or base.get("image")
-            if base_image and not data.get("image"):
-                data["image"] = base_image
-                data["image_url"] = base_image
-            if item_trace:
-                data["trace"] = item_trace
-            enriched.append(data)
+        # 各活動的詳情互不相依，並行抓取；map 保留原本順序
+        enriched = [
+            data for data in _LIFF_ENRICH_POOL.map(lambda base: _enrich_liff_item(base, sess, debug), items)
+            if data is not None
+        ]
         if enriched:
             items = enriched
             trace.append({"phase": "enrich", "count": len(items)})
@@ -4381,6 +5396,21 @@ def liff_watch_status():
 
     results: Dict[str, Dict[str, Any]] = {}
 
+    # 先算好各網址的 canonical 形式，再用 'in' 查詢一次撈回，不再每個網址各打一次 Firestore
+    canon_map: Dict[str, str] = {}
+    canon_errors: Dict[str, str] = {}
+    docs_by_canon: Optional[Dict[str, Any]] = None
+    if FS_OK:
+        for url in clean_urls:
+            try:
+                canon_map[url] = canonicalize_url(url)
+            except Exception as e:
+                canon_errors[url] = str(e)
+        try:
+            docs_by_canon = fs_get_tasks_by_canons(chat_id, list(canon_map.values()))
+        except Exception as e:
+            _get_logger().info(f"[liff_watch_status] batch lookup failed, fallback to per-url: {e}")
+
     for url in clean_urls:
         entry = {"watching": False, "enabled": False, "taskId": None, "found": False}
 
@@ -4389,8 +5419,13 @@ def liff_watch_status():
             continue
 
         try:
-            canon = canonicalize_url(url)
-            doc = fs_get_task_by_canon(chat_id, canon)
+            if url in canon_errors:
+                raise ValueError(canon_errors[url])
+            canon = canon_map[url]
+            if docs_by_canon is not None:
+                doc = docs_by_canon.get(canon)
+            else:
+                doc = fs_get_task_by_canon(chat_id, canon)
         except Exception as e:
             _get_logger().error(f"[liff_watch_status] lookup failed for {url}: {e}")
             entry["error"] = str(e)
@@ -4466,13 +5501,23 @@ def netcheck():
         "https://ticket.ibon.com.tw/Index/entertainment",
         "https://ticket.ibon.com.tw/api/ActivityInfo/GetIndexData",
     ]
-    out = []
-    for u in urls:
+    sess = sess_default()
+
+    def _check_one(u: str) -> Dict[str, Any]:
         try:
-            r = requests.get(u, timeout=10)
-            out.append({"url": u, "http": r.status_code, "len": len(r.text)})
+            # 串流讀 bytes 算長度就好，不必把整包解碼成字串
+            r = http_get(sess, u, timeout=10, stream=True)
+            try:
+                size = sum(len(c) for c in r.iter_content(65536))
+            finally:
+                r.close()
+            return {"url": u, "http": r.status_code, "len": size}
         except Exception as e:
-            out.append({"url": u, "error": repr(e)})
+            return {"url": u, "error": repr(e)}
+
+    # 同時打三個網址，網路不穩時最多等一個逾時而不是三個相加
+    with ThreadPoolExecutor(max_workers=len(urls), thread_name_prefix="netcheck") as pool:
+        out = list(pool.map(_check_one, urls))
     return jsonify({"results": out})
 
 @main_bp.get("/__whoami")
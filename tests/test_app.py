@@ -1,11 +1,17 @@
 import json
 import os
 import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qs
 
 import pytest
+import requests
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+import app as app_module  # noqa: E402
 from app import (  # noqa: E402
     app as flask_app,
     build_ibon_details_url,
@@ -14,6 +20,8 @@ from app import (  # noqa: E402
     _collect_datetime_candidates,
     _parse_price_value,
     _interpret_utk_status,
+    _looks_like_concert,
+    _scan_query,
 )
 
 
@@ -28,6 +36,152 @@ def _assert_status(resp, allowed_codes):
     assert resp.status_code in allowed_codes, f"unexpected status {resp.status_code} for {resp.request.path}"
 
 
+# ---- 共用的 HTTP 假物件 ----
+
+class FakeResp:
+    """requests.Response 的最小替身；body 可給 str 或 bytes。"""
+
+    def __init__(self, status=200, body=b"", headers=None, url=""):
+        self.status_code = status
+        self.content = body.encode("utf-8") if isinstance(body, str) else body
+        self.headers = headers or {}
+        self.encoding = "utf-8"
+        self.url = url
+        self.history = []
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """把 get/post 轉給測試提供的函式：get(url, **kwargs) / post(url, **kwargs)。"""
+
+    def __init__(self, get=None, post=None):
+        self._get = get
+        self._post = post
+
+    def get(self, url, **kwargs):
+        return self._get(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self._post(url, **kwargs)
+
+
+# ---- 共用的 Firestore 假物件（記憶體內，單一 collection）----
+
+class FakeSnapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeDocRef:
+    def __init__(self, db, doc_id):
+        self._db = db
+        self.id = doc_id
+
+    def get(self):
+        return FakeSnapshot(self.id, self._db.docs.get(self.id))
+
+    def set(self, data):
+        self._db.docs[self.id] = dict(data)
+
+    def update(self, payload):
+        if self.id not in self._db.docs:
+            raise RuntimeError(f"404 NOT_FOUND: {self.id}")
+        self._db.docs[self.id].update(payload)
+        self._db.updated[self.id] = payload
+
+
+class FakeQuery:
+    """只套用 == 與 in 條件；排序、範圍條件與 limit 忽略（由測試資料自行安排）。"""
+
+    def __init__(self, db, filters=()):
+        self._db = db
+        self._filters = list(filters)
+
+    def where(self, *args, filter=None):
+        if filter is None:
+            self._db.positional_where += 1
+            field, op, value = args
+        else:
+            field, op, value = filter.field_path, filter.op_string, filter.value
+        return FakeQuery(self._db, self._filters + [(field, op, value)])
+
+    def order_by(self, *args, **kwargs):
+        return self
+
+    def limit(self, n):
+        return self
+
+    def stream(self):
+        self._db.queries.append(self._filters)
+        for doc_id, data in list(self._db.docs.items()):
+            if all(
+                (data.get(f) == v) if op == "==" else (data.get(f) in v) if op == "in" else True
+                for f, op, v in self._filters
+            ):
+                yield FakeSnapshot(doc_id, data)
+
+
+class FakeCollection(FakeQuery):
+    def document(self, doc_id):
+        return FakeDocRef(self._db, doc_id)
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self._db = db
+        self._ops = []
+
+    def update(self, ref, payload):
+        self._ops.append((ref, payload))
+
+    def commit(self):
+        # 跟 Firestore 一樣是原子的：有一筆文件不存在就整批不寫
+        self._db.commits.append(len(self._ops))
+        missing = [ref.id for ref, _ in self._ops if ref.id not in self._db.docs]
+        if missing:
+            raise RuntimeError(f"404 NOT_FOUND: {missing[0]}")
+        for ref, payload in self._ops:
+            ref.update(payload)
+
+
+class FakeFirestore:
+    def __init__(self, docs=None):
+        self.docs = dict(docs or {})
+        self.updated = {}
+        self.queries = []
+        self.commits = []
+        self.positional_where = 0
+
+    def collection(self, name):
+        return FakeCollection(self)
+
+    def batch(self):
+        return FakeBatch(self)
+
+
+@pytest.fixture()
+def fake_fs(monkeypatch):
+    db = FakeFirestore()
+    monkeypatch.setattr(app_module, "FS_OK", True)
+    monkeypatch.setattr(app_module, "fs_client", db)
+    return db
+
+
 def test_liff_activities(client):
     resp = client.get("/liff/activities")
     _assert_status(resp, {200})
@@ -55,6 +209,22 @@ def test_helper_build_and_sanitize_details_url():
     assert cleaned.endswith("id=39125&pattern=ENTERTAINMENT")
 
 
+@pytest.mark.parametrize(
+    "query",
+    [
+        "id=39125&pattern=ENTERTAINMENT",
+        "pattern=CONCERT&id=&id=77",
+        "foo=1&id=12%2634&pattern=A+B",
+        "%69d=5&pattern",
+        "",
+    ],
+)
+def test_scan_query_matches_parse_qs(query):
+    keys = ("id", "pattern")
+    expected = {k: v[0] for k, v in parse_qs(query).items() if k in keys}
+    assert _scan_query(query, keys) == expected
+
+
 def test_clean_venue_text_removes_time():
     raw = "TICC 臺北國際會議中心 18:00"
     cleaned = _clean_venue_text(raw)
@@ -81,6 +251,13 @@ def test_collect_datetime_candidates_skips_ranges():
     for _, _, raw in candidates:
         assert "~" not in raw and "～" not in raw
 
+def test_looks_like_concert_case_insensitive():
+    assert _looks_like_concert("五月天 live tour")
+    assert _looks_like_concert("FAN MEETING 2025")
+    assert not _looks_like_concert("親子劇場")
+    assert not _looks_like_concert(None)
+
+
 def test_parse_price_value_handles_currency():
     assert _parse_price_value("票價 NT$2,800") == 2800
 
@@ -107,3 +284,531 @@ def test_watch_endpoints_no_firestore(client, endpoint):
     data = resp.get_json()
     assert isinstance(data, dict)
     assert data.get("ok") is False
+
+
+def test_prepare_ibon_session_reuses_cached_token(monkeypatch):
+    calls = []
+
+    def fake_refresh(sess):
+        calls.append(sess)
+        return f"tok-{len(calls)}"
+
+    monkeypatch.setattr(app_module, "_refresh_ibon_token", fake_refresh)
+    monkeypatch.setattr(app_module, "_token_cache", {"ts": 0.0, "token": None})
+
+    s1, t1 = app_module._prepare_ibon_session()
+    s2, t2 = app_module._prepare_ibon_session()
+    assert s1 is s2
+    assert t1 == t2 == "tok-1"
+    assert len(calls) == 1
+
+    _, t3 = app_module._prepare_ibon_session(refresh=True)
+    assert t3 == "tok-2"
+
+
+def test_disk_cache_roundtrip_and_expiry(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "_DISK_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    rows = [{"title": "測試", "url": "https://ticket.ibon.com.tw/ActivityInfo/Details?id=1&pattern=ENTERTAINMENT"}]
+    app_module._disk_cache_set("ibon_list", rows)
+
+    hit = app_module._disk_cache_get("ibon_list", 300)
+    assert hit is not None and hit[1] == rows
+    assert app_module._disk_cache_get("ibon_list", 0) is None
+    assert app_module._disk_cache_get("missing", 300) is None
+
+
+def test_fetch_ibon_list_via_api_filters_cached_rows(monkeypatch):
+    rows = [
+        {"title": "五月天 演唱會"},
+        {"title": "親子劇場"},
+        {"title": "Jazz Live Night"},
+        {"title": "周杰倫 演唱會"},
+    ]
+    monkeypatch.setattr(app_module, "_cache", {"ts": time.time(), "data": rows})
+
+    assert app_module.fetch_ibon_list_via_api(limit=10, only_concert=True) == [rows[0], rows[2], rows[3]]
+    assert app_module.fetch_ibon_list_via_api(limit=1, only_concert=True) == [rows[0]]
+    assert app_module.fetch_ibon_list_via_api(limit=10, keyword="jazz") == [rows[2]]
+    assert app_module.fetch_ibon_list_via_api(limit=0) == [rows[0]]
+
+
+def test_fetch_ibon_list_via_api_refetches_truncated_cache(monkeypatch):
+    rows = [{"title": "五月天 演唱會"}, {"title": "親子劇場"}]
+    monkeypatch.setattr(app_module, "_cache", {"ts": time.time(), "data": rows, "complete": False})
+    monkeypatch.setattr(app_module, "_disk_cache_get", lambda *a, **k: None)
+    monkeypatch.setattr(app_module, "_breaker_open_now", lambda: True)
+
+    # 截斷的前綴湊得滿就直接用，湊不滿要重抓（這裡斷路器開著所以回空）
+    assert app_module.fetch_ibon_list_via_api(limit=1) == [rows[0]]
+    assert app_module.fetch_ibon_list_via_api(limit=5) == []
+
+
+def test_decode_ibon_html_defaults_to_utf8_for_ibon_hosts():
+    resp = requests.Response()
+    resp._content = "五月天 演唱會".encode("utf-8")
+    resp.url = "https://ticket.ibon.com.tw/ActivityInfo/Details?id=1"
+    resp.headers["Content-Type"] = "text/html"
+    resp.encoding = "ISO-8859-1"  # requests' default for text/* without charset
+    assert app_module._decode_ibon_html(resp) == "五月天 演唱會"
+
+
+def test_promo_maps_parse_lazily(monkeypatch):
+    monkeypatch.setattr(app_module, "_PROMO_IMAGE_MAP", None)
+    monkeypatch.setattr(app_module, "_PROMO_DETAILS_MAP", None)
+    monkeypatch.setenv("PROMO_IMAGE_MAP", '{"P1": "https://img.example/p1.jpg"}')
+    monkeypatch.setenv("PROMO_DETAILS_MAP", "not json")
+
+    assert app_module.promo_image_map() == {"P1": "https://img.example/p1.jpg"}
+    assert app_module.promo_details_map() == {}
+    # 解析一次後就固定，不再讀環境變數
+    monkeypatch.setenv("PROMO_IMAGE_MAP", "{}")
+    assert app_module.promo_image_map() == {"P1": "https://img.example/p1.jpg"}
+
+
+@pytest.mark.parametrize(
+    "raw,expected",
+    [
+        ("2024-06-10T19:30:00", "2024/06/10 19:30"),
+        ("2024-06-10T19:30:00.123Z", "2024/06/10 19:30"),
+        ("2024-06-10T19:30:00+08:00", "2024/06/10 19:30"),
+        ("2024-6-1T9:05:00", "2024/06/01 09:05"),
+        ("2024-02-30T19:30:00", None),
+        ("", None),
+    ],
+)
+def test_format_api_dt(raw, expected):
+    assert app_module._format_api_dt(raw) == expected
+
+
+def test_fetch_game_info_from_api_caches_result(monkeypatch):
+    posts = []
+
+    def fake_post(url, json=None, **kwargs):
+        posts.append(json)
+        return FakeResp(200, b'{"Item": {"ActivityID": 39125, "ActivityName": "Test Live"}}')
+
+    monkeypatch.setattr(app_module, "_GAME_INFO_CACHE", {})
+    monkeypatch.setattr(app_module, "_prepare_ibon_session", lambda refresh=False: (FakeSession(post=fake_post), None))
+
+    referer = "https://ticket.ibon.com.tw/ActivityInfo/Details?id=39125&pattern=ENTERTAINMENT"
+    first = app_module.fetch_game_info_from_api(None, None, referer, None)
+    assert first.get("activity_id") == "39125"
+    assert len(posts) == 1
+
+    first["title"] = "mutated"
+    second = app_module.fetch_game_info_from_api(None, None, referer, None)
+    assert second.get("title") == "Test Live"
+    assert len(posts) == 1
+
+
+def test_url_ok_caches_probe_results(monkeypatch):
+    calls = []
+
+    def fake_probe(u):
+        calls.append(u)
+        return u.endswith(".jpg")
+
+    monkeypatch.setattr(app_module, "_URL_OK_CACHE", {})
+    monkeypatch.setattr(app_module, "_probe_url", fake_probe)
+
+    assert app_module._url_ok("https://img.example/a.jpg") is True
+    assert app_module._url_ok("https://img.example/a.jpg") is True
+    assert app_module._url_ok("https://img.example/missing") is False
+    assert app_module._url_ok("https://img.example/missing") is False
+    assert app_module._url_ok("ftp://img.example/a.jpg") is False
+    assert calls == ["https://img.example/a.jpg", "https://img.example/missing"]
+
+
+def test_hash_state_is_order_independent():
+    a = app_module.hash_state({"A區": 3, "B區": 5}, ["搖滾區", "看台"])
+    assert a == app_module.hash_state({"B區": 5, "A區": 3}, ["看台", "搖滾區"])
+    assert len(a) == 16
+    assert a != app_module.hash_state({"A區": 3, "B區": 4}, ["搖滾區", "看台"])
+    assert a != app_module.hash_state({"A區": 3, "B區": 5}, ["搖滾區", "看台"], sold_out=True)
+
+
+def test_extract_area_meta_skips_parse_without_markers(monkeypatch):
+    def _boom(html):
+        raise AssertionError("should not parse")
+
+    monkeypatch.setattr(app_module, "soup_parse", _boom)
+    assert app_module.extract_area_meta_from_000("<html><body>nothing</body></html>") == ({}, {}, {}, {}, {})
+    monkeypatch.undo()
+
+    html = (
+        "<script>var jsonData = '[{\"PERFORMANCE_PRICE_AREA_ID\":\"B0ABC1234\",\"NAME\":\"A 區\",\"AMOUNT\":\"12\",\"SORT\":1}]';</script>"
+    )
+    names, status, qty, order, _ = app_module.extract_area_meta_from_000(html)
+    assert names == {"B0ABC1234": "A區"}
+    assert qty == {"B0ABC1234": 12}
+    assert order == {"B0ABC1234": 1}
+
+
+def test_resolve_utk_url_prefers_earliest_successful_combo(monkeypatch):
+    def fake_get(url, params=None, **kwargs):
+        if params.get("SystemBrowseType") == "2":
+            return FakeResp(404, url=url)
+        browse = params.get("SystemBrowseType", "none")
+        return FakeResp(200, url=f"https://orders.ibon.com.tw/UTK02/UTK0201_000.aspx?b={browse}")
+
+    monkeypatch.setattr(app_module, "UTK_BACKOFF", (0,))
+    trace = []
+    got = app_module._resolve_utk_url(
+        "39125", "ENTERTAINMENT", FakeSession(get=fake_get), "https://ticket.ibon.com.tw/", trace=trace
+    )
+    assert got == "https://orders.ibon.com.tw/UTK02/UTK0201_000.aspx?b=1"
+    assert trace and all(t["phase"] == "utk_resolve" for t in trace)
+
+
+def test_line_pushes_are_batched_per_recipient(monkeypatch):
+    pushed = []
+
+    class FakeLineApi:
+        def push_message(self, to, messages):
+            pushed.append((to, messages if isinstance(messages, list) else [messages]))
+
+    if not app_module.HAS_LINE:
+        pytest.skip("line-bot-sdk not installed")
+    monkeypatch.setattr(app_module, "line_bot_api", FakeLineApi())
+    monkeypatch.setattr(app_module, "_PUSH_ASYNC", True)
+    # 放寬合併視窗，避免測試機慢時同一收件者的訊息被拆成兩包
+    monkeypatch.setattr(app_module, "_PUSH_BATCH_WINDOW", 2.0)
+
+    app_module.send_image("U1", "https://img.example/a.jpg")
+    app_module.send_text("U1", "hello")
+    app_module.send_text("U1", "again")
+    app_module.send_text("U2", "other")
+    assert app_module._flush_line_pushes(timeout=5)
+
+    # 圖片不與票況文字同包
+    assert [(to, len(msgs)) for to, msgs in pushed] == [("U1", 1), ("U1", 2), ("U2", 1)]
+
+
+@pytest.mark.parametrize("status, expected", [
+    (400, [("U1", "a"), ("U1", "b")]),
+    (500, []),
+])
+def test_line_batched_push_failure_resends_only_on_400(monkeypatch, status, expected):
+    if not app_module.HAS_LINE:
+        pytest.skip("line-bot-sdk not installed")
+    from linebot.models import Error
+    pushed = []
+
+    class FakeLineApi:
+        def push_message(self, to, messages):
+            if isinstance(messages, list):
+                raise app_module.LineBotApiError(status, {}, error=Error(message="rejected"))
+            pushed.append((to, messages))
+
+    monkeypatch.setattr(app_module, "line_bot_api", FakeLineApi())
+
+    app_module._deliver_push("U1", ["a", "b"])
+
+    assert pushed == expected
+
+
+def test_line_batched_push_timeout_is_not_resent(monkeypatch):
+    pushed = []
+
+    class FakeLineApi:
+        def push_message(self, to, messages):
+            if isinstance(messages, list):
+                raise TimeoutError("read timed out")
+            pushed.append((to, messages))
+
+    monkeypatch.setattr(app_module, "line_bot_api", FakeLineApi())
+
+    app_module._deliver_push("U1", ["a", "b"])
+
+    assert pushed == []
+
+
+def test_list_command_chunks_long_task_lists(monkeypatch):
+    rows = [
+        {"id": f"T{i:04d}", "enabled": True, "period": 60,
+         "url": f"https://ticket.ibon.com.tw/ActivityInfo/Details/{i}"}
+        for i in range(200)
+    ]
+    monkeypatch.setattr(app_module, "HAS_LINE", False)
+    monkeypatch.setattr(app_module, "fs_list", lambda chat_id, show="on": rows)
+
+    chunks = app_module.handle_command("/list", "U1")
+
+    assert len(chunks) > 1
+    assert chunks[0].startswith("你的任務：")
+    assert all(len(c) <= 4800 for c in chunks)
+    joined = "\n\n".join(chunks)
+    assert all(r["id"] in joined for r in rows)
+
+
+def test_fetch_from_ticket_details_revalidates_with_etag(monkeypatch):
+    html = "<html><head><title>Test Live</title></head><body>演出地點：Legacy Taipei</body></html>"
+    url = "https://ticket.ibon.com.tw/ActivityInfo/Details?id=1&pattern=ENTERTAINMENT"
+    seen_headers = []
+
+    def fake_get(req_url, headers=None, **kwargs):
+        seen_headers.append(dict(headers or {}))
+        if headers and headers.get("If-None-Match") == '"v1"':
+            return FakeResp(304, url=url)
+        return FakeResp(200, html, {"ETag": '"v1"'}, url=url)
+
+    monkeypatch.setattr(app_module, "_DETAILS_HTML_CACHE", {})
+    monkeypatch.setattr(app_module, "_DETAILS_RESULT_TTL", 0)
+    monkeypatch.setattr(app_module, "_prepare_ibon_session", lambda refresh=False: (None, None))
+
+    first = app_module.fetch_from_ticket_details(url, FakeSession(get=fake_get))
+    second = app_module.fetch_from_ticket_details(url, FakeSession(get=fake_get))
+
+    assert seen_headers[0] == {}
+    assert seen_headers[1].get("If-None-Match") == '"v1"'
+    assert first.get("title") and first.get("title") == second.get("title")
+    assert first.get("place") == second.get("place")
+
+
+def test_fetch_from_ticket_details_caches_result_briefly(monkeypatch):
+    calls = []
+
+    def fake_uncached(url, sess):
+        calls.append(url)
+        return {"details_url": url, "pattern": "ENTERTAINMENT", "title": "Live", "ticket_urls": ["https://a"]}
+
+    monkeypatch.setattr(app_module, "_DETAILS_RESULT_CACHE", {})
+    monkeypatch.setattr(app_module, "_DETAILS_RESULT_TTL", 45.0)
+    monkeypatch.setattr(app_module, "_fetch_from_ticket_details_uncached", fake_uncached)
+
+    url = "https://ticket.ibon.com.tw/ActivityInfo/Details/123"
+    first = app_module.fetch_from_ticket_details(url, None)
+    first["ticket_urls"].append("https://mutated")
+    second = app_module.fetch_from_ticket_details(url, None)
+
+    assert len(calls) == 1
+    assert second["ticket_urls"] == ["https://a"]
+
+
+def test_try_fetch_livemap_by_perf_prefers_first_hit_in_order(monkeypatch):
+    def fake_get(sess, url, **kwargs):
+        if url.endswith("/1_P1_live.map"):
+            return FakeResp(200, "<area href=\"javascript:Send('B0AAAAAAA','B0BBBBBBB')\" title=\"剩餘 5\">")
+        if url.endswith("/02_P1_live.map"):
+            return FakeResp(200, "<area href=\"javascript:Send('B0AAAAAAA','B0CCCCCCC')\" title=\"剩餘 9\">")
+        return FakeResp(404)
+
+    monkeypatch.setattr(app_module, "http_get", fake_get)
+    monkeypatch.setattr(app_module, "_decode_ibon_html", lambda r: r.text)
+
+    sections, total = app_module.try_fetch_livemap_by_perf("P1", None)
+    assert sections == {"B0BBBBBBB": 5}
+    assert total == 5
+
+
+def test_try_fetch_livemap_by_perf_probes_seatmap_base_first(monkeypatch):
+    def fake_get(sess, url, **kwargs):
+        if url.startswith("https://cdn.example/images/P1/"):
+            return FakeResp(200, "<area href=\"javascript:Send('B0AAAAAAA','B0DDDDDDD')\" title=\"剩餘 3\">")
+        if url.endswith("/1_P1_live.map"):
+            return FakeResp(200, "<area href=\"javascript:Send('B0AAAAAAA','B0BBBBBBB')\" title=\"剩餘 5\">")
+        return FakeResp(404)
+
+    monkeypatch.setattr(app_module, "http_get", fake_get)
+    monkeypatch.setattr(app_module, "_decode_ibon_html", lambda r: r.text)
+
+    sections, total = app_module.try_fetch_livemap_by_perf(
+        "P1", None, seatmap="https://cdn.example/images/P1/seat.jpg")
+    assert sections == {"B0DDDDDDD": 3}
+    assert total == 3
+
+
+def test_perform_cron_tick_probes_due_watchers_concurrently(fake_fs, monkeypatch):
+    now = datetime.now(timezone.utc)
+    fake_fs.docs.update({
+        "a": {"enabled": True, "url": "https://x/a", "last_sig": "old", "period": 60},
+        "b": {"enabled": True, "url": "https://x/b", "last_sig": "same", "period": 60},
+        "c": {"enabled": True, "url": "https://x/c", "next_run_at": now + timedelta(hours=1)},
+        "d": {"enabled": True, "url": "https://x/a", "last_sig": "old", "period": 60},
+    })
+
+    barrier = threading.Barrier(2, timeout=5)
+    probed = []
+
+    def fake_probe(url):
+        probed.append(url)
+        barrier.wait()  # 兩個 probe 必須同時在跑才會通過
+        return {"ok": True, "sig": "same" if url.endswith("/b") else "new", "total": 3, "url": url}
+
+    texts = []
+    monkeypatch.setattr(app_module, "TICK_WORKERS", 4)
+    monkeypatch.setattr(app_module, "probe", fake_probe)
+    # 推播時該 watcher 的新 last_sig 必須已寫入
+    monkeypatch.setattr(app_module, "send_text", lambda chat_id, text: texts.append((text, set(fake_fs.updated))))
+    monkeypatch.setattr(app_module, "fmt_result_text", lambda res: res["url"])
+
+    result = app_module._perform_cron_tick()
+
+    assert result["processed"] == 3
+    assert result["skipped"] == 1
+    assert sorted(probed) == ["https://x/a", "https://x/b"]  # a 與 d 同網址只 probe 一次
+    assert set(fake_fs.updated) == {"a", "b", "d"}
+    assert sorted(fake_fs.commits) == [1, 2]  # 每個 URL 一批，推播前先 commit
+    assert fake_fs.docs["a"]["last_sig"] == fake_fs.docs["d"]["last_sig"] == "new"
+    assert [text for text, _ in texts] == ["https://x/a", "https://x/a"]
+    assert all({"a", "d"} <= written for _, written in texts)
+
+
+def test_probe_caches_and_coalesces_by_canonical_url(monkeypatch):
+    calls = []
+    release = threading.Event()
+
+    def fake_uncached(url):
+        calls.append(url)
+        release.wait(5)
+        return {"ok": True, "sig": "s1", "url": url, "sections": {"A": 1}}
+
+    monkeypatch.setattr(app_module, "_probe_uncached", fake_uncached)
+    monkeypatch.setattr(app_module, "_PROBE_CACHE", {})
+    monkeypatch.setattr(app_module, "_PROBE_INFLIGHT", {})
+    monkeypatch.setattr(app_module, "_PROBE_TTL", 30.0)
+
+    url_a = "https://orders.ibon.com.tw/x?PRODUCT_ID=2&PERFORMANCE_ID=1"
+    url_b = "https://orders.ibon.com.tw/x?PERFORMANCE_ID=1&PRODUCT_ID=2"
+    results = []
+    threads = [threading.Thread(target=lambda u=u: results.append(app_module.probe(u))) for u in (url_a, url_b)]
+    for t in threads:
+        t.start()
+    for _ in range(500):
+        if calls:
+            break
+        threading.Event().wait(0.01)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert len(calls) == 1
+    assert len(results) == 2
+    results[0]["sections"]["A"] = 99
+    assert app_module.probe(url_a)["sections"] == {"A": 1}
+    assert len(calls) == 1
+    app_module.probe(url_a, fresh=True)
+    assert len(calls) == 2
+
+
+def test_check_endpoint_serializes_probe_result(client, monkeypatch):
+    res = {"ok": True, "title": "五月天 演唱會", "sections": {"A區": 2}, "total": 2}
+    monkeypatch.setattr(app_module, "probe", lambda url, fresh=False: res)
+
+    resp = client.get("/check", query_string={"url": "https://ticket.ibon.com.tw/x"})
+    _assert_status(resp, {200})
+    assert resp.mimetype == "application/json"
+    assert resp.get_json() == res
+
+
+def test_spawn_background_worker_sheds_load_when_backlogged(monkeypatch):
+    monkeypatch.setattr(app_module, "_BACKGROUND_MAX_PENDING", 1)
+    release = threading.Event()
+    done = threading.Event()
+
+    def blocker():
+        release.wait(5)
+        done.set()
+
+    assert app_module._spawn_background_worker(flask_app, "t1", blocker)
+    assert not app_module._spawn_background_worker(flask_app, "t2", lambda: None)
+    release.set()
+    assert done.wait(5)
+
+
+def test_fs_get_task_by_id_uses_point_read_for_new_tasks(fake_fs):
+    tid, created = app_module.fs_upsert_watch("U1", "https://x/a?b=2&a=1", 60)
+    assert created
+    fake_fs.queries.clear()
+
+    doc = app_module.fs_get_task_by_id("U1", tid)
+    assert doc is not None and doc.to_dict()["id"] == tid
+    assert fake_fs.queries == []
+    assert app_module.fs_get_task_by_id("U2", tid) is None
+
+
+def test_fetch_ibon_carousel_caches_and_serves_stale_on_failure(monkeypatch):
+    results = [[{"title": "五月天 演唱會", "url": "https://x/1"}], []]
+    calls = []
+
+    def fake_uncached(limit=10, keyword=None, only_concert=False):
+        calls.append(limit)
+        return results[len(calls) - 1]
+
+    monkeypatch.setattr(app_module, "_fetch_ibon_carousel_from_api_uncached", fake_uncached)
+    monkeypatch.setattr(app_module, "_CAROUSEL_CACHE", {})
+    monkeypatch.setattr(app_module, "_CAROUSEL_TTL", 20.0)
+
+    first = app_module.fetch_ibon_carousel_from_api(limit=5)
+    first[0]["title"] = "mutated"
+    assert app_module.fetch_ibon_carousel_from_api(limit=5)[0]["title"] == "五月天 演唱會"
+    assert len(calls) == 1
+
+    monkeypatch.setattr(app_module, "_CAROUSEL_TTL", 0.0)
+    assert app_module.fetch_ibon_carousel_from_api(limit=5)[0]["title"] == "五月天 演唱會"
+    assert len(calls) == 2
+
+
+def test_collect_liff_items_enriches_concurrently_in_order(monkeypatch):
+    items = [{"title": f"t{i}", "url": f"https://x/{i}", "image": f"https://img/{i}.jpg"} for i in range(3)]
+    barrier = threading.Barrier(3, timeout=5)
+
+    def fake_probe(url, sess, trace=None):
+        barrier.wait()  # 三筆都同時在跑才會通過
+        if url.endswith("/1"):
+            raise RuntimeError("boom")
+        return {"url": url}
+
+    monkeypatch.setattr(app_module, "fetch_ibon_carousel_from_api", lambda **kwargs: items)
+    monkeypatch.setattr(app_module, "_probe_activity_details", fake_probe)
+
+    out, mode, trace = app_module._collect_liff_items(10, None, False, "auto", False)
+
+    assert mode == "carousel"
+    assert [it["url"] for it in out] == ["https://x/0", "https://x/2"]
+    assert out[0]["image"] == "https://img/0.jpg"
+    assert trace[-1] == {"phase": "enrich", "count": 2}
+
+
+def test_liff_watch_status_batches_canon_lookups(client, fake_fs):
+    fake_fs.docs["t1-doc"] = {"chat_id": "U1", "url_canon": "https://x/a", "id": "t1", "enabled": True, "period": 60}
+
+    resp = client.post("/liff/watch_status", json={"chatId": "U1", "urls": ["https://x/a", "https://x/b"]})
+    results = resp.get_json()["results"]
+
+    assert len(fake_fs.queries) == 1
+    assert fake_fs.positional_where == 0
+    assert results["https://x/a"]["taskId"] == "t1" and results["https://x/a"]["watching"]
+    assert results["https://x/b"]["found"] is False
+
+
+def test_netcheck_probes_urls_concurrently(client, monkeypatch):
+    barrier = threading.Barrier(3, timeout=5)
+
+    def fake_get(sess, url, **kwargs):
+        barrier.wait()  # 三個網址同時在跑才會通過
+        if "google" in url:
+            raise RuntimeError("offline")
+        return FakeResp(200, b"abc")
+
+    monkeypatch.setattr(app_module, "http_get", fake_get)
+
+    results = client.get("/netcheck").get_json()["results"]
+
+    assert [r["url"] for r in results][0] == "https://www.google.com"
+    assert "error" in results[0]
+    assert [(r.get("http"), r.get("len")) for r in results[1:]] == [(200, 3), (200, 3)]
+
+
+def test_tick_writer_falls_back_to_single_updates_when_batch_fails(fake_fs):
+    fake_fs.docs.update({"a": {}, "b": {}})  # "gone" 在查詢後被刪掉
+    resp = {"errors": []}
+    writer = app_module._TickWriter(resp)
+    writer.update("a", {"last_sig": "x"})
+    writer.update("gone", {"last_sig": "y"})
+    writer.update("b", {"last_sig": "z"})
+    writer.commit()
+
+    assert fake_fs.commits == [3]
+    assert fake_fs.updated == {"a": {"last_sig": "x"}, "b": {"last_sig": "z"}}
+    assert len(resp["errors"]) == 1